@@ -0,0 +1,102 @@
+"""Micro-benchmarks for constructing documents and reading their fields.
+
+Compares the descriptor-based fields with the `__getattribute__`/`__setattr__`
+overrides `DocumentModel` used to have. Run from the repository root with the
+App Engine SDK on the path:
+
+    python benchmarks/bench_documents.py
+"""
+import datetime
+import timeit
+
+from search import fields
+from search.indexes import DocumentModel
+
+
+N = 1000
+REPEAT = 5
+
+
+class FilmDocument(DocumentModel):
+    title = fields.TextField()
+    description = fields.TextField()
+    rating = fields.FloatField()
+    votes = fields.IntegerField()
+    released = fields.DateField()
+    available = fields.BooleanField()
+
+
+class LegacyFilmDocument(object):
+    """How `DocumentModel` used to convert field values, for comparison"""
+    _meta = FilmDocument._meta
+    _loaded = None
+
+    def __init__(self, **kwargs):
+        for name, field in self._meta.fields.items():
+            val = kwargs.pop(name, None)
+            setattr(self, name, val)
+
+        self.doc_id = unicode(kwargs.get('doc_id', '')).encode('utf-8') or None
+        self._rank = kwargs.get("_rank")
+
+    def __getattribute__(self, name):
+        val = object.__getattribute__(self, name)
+        meta = object.__getattribute__(self, '_meta')
+        if name in meta.fields:
+            f = meta.fields[name]
+            val = f.to_python(val)
+        return val
+
+    def __setattr__(self, name, val):
+        if name in self._meta.fields:
+            f = self._meta.fields[name]
+            val = f.to_search_value(val)
+        object.__setattr__(self, name, val)
+
+    get_snippets = DocumentModel.__dict__['get_snippets']
+    snippet_or_value = DocumentModel.__dict__['snippet_or_value']
+
+
+VALUES = {
+    'doc_id': 'die-hard',
+    'title': u'Die Hard',
+    'description': u'The most awesome film ever',
+    'rating': 9.7,
+    'votes': 1234,
+    'released': datetime.date(1989, 2, 3),
+    'available': True,
+}
+
+
+def construct(document_class):
+    for _ in xrange(N):
+        document_class(**VALUES)
+
+
+def read_fields(documents):
+    for doc in documents:
+        doc.title, doc.description, doc.rating, doc.votes, doc.released, doc.available
+
+
+def snippet_or_value(document_class):
+    for _ in xrange(N):
+        document_class(**VALUES).snippet_or_value()
+
+
+def report(name, fn, *args):
+    best = min(timeit.repeat(lambda: fn(*args), number=1, repeat=REPEAT))
+    print "%-45s %8.2f ms / %d docs" % (name, best * 1000, N)
+
+
+def main():
+    for document_class in (LegacyFilmDocument, FilmDocument):
+        label = document_class.__name__
+        documents = [document_class(**VALUES) for _ in xrange(N)]
+
+        report("%s: construct" % label, construct, document_class)
+        report("%s: read all fields" % label, read_fields, documents)
+        report("%s: snippet_or_value" % label, snippet_or_value, document_class)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Micro-benchmarks for building query strings from deep trees of `Q`s.
+
+Compares `ql.Query`, which keeps the query string compiled for each
+(immutable) `Q` node on the node, to unparsing the whole tree every time like
+it used to, and building a fresh query for each set of filter values with
+binding them to a prepared one. Run from the repository root with the App
+Engine SDK on the path:
+
+    python benchmarks/bench_ql.py
+"""
+import timeit
+
+from search import fields
+from search.indexes import DocumentModel
+from search.ql import Param, Q, Query
+
+
+REPEAT = 5
+
+
+class FilmDocument(DocumentModel):
+    title = fields.TextField()
+    rating = fields.FloatField()
+    votes = fields.IntegerField()
+
+
+class LegacyQuery(Query):
+    """How `Query` used to unparse `Q` trees, for comparison"""
+    def unparse_filter(self, child, template=False):
+        if isinstance(child, Q):
+            tmpl = u'(%s)'
+            if child.inverted:
+                tmpl = u'%s (%s)' % (child.NOT, '%s')
+
+            conn = u' %s ' % child.conn
+            return tmpl % (
+                conn.join([self.unparse_filter(c, template) for c in child.children])
+            )
+        return super(LegacyQuery, self).unparse_filter(child, template)
+
+
+def make_q(i):
+    return (
+        Q(title__contains='die hard %d' % i) |
+        (Q(rating__gte=i / 10.0) & ~Q(votes__lt=i))
+    )
+
+
+def chained_filters(query_class, n):
+    """Add `n` filters one at a time, stringifying the query after each, like
+    a chain of `SearchQuery.filter` calls that each get run.
+    """
+    query = query_class(FilmDocument)
+    for i in xrange(n):
+        query.add_q(make_q(i))
+        str(query)
+
+
+def balanced_tree(depth):
+    if depth == 0:
+        return make_q(depth)
+    return balanced_tree(depth - 1) & balanced_tree(depth - 1)
+
+
+def repeated_str(query, n):
+    """Stringify the same query `n` times, like `_run_query`,
+    `get_snippet_words` and debug output all do.
+    """
+    for i in xrange(n):
+        str(query)
+
+
+def param_q():
+    return (
+        Q(title__contains=Param('title')) |
+        (Q(rating__gte=Param('rating')) & ~Q(votes__lt=Param('votes')))
+    )
+
+
+def fresh_queries(n):
+    """Build and stringify a new query for each of `n` sets of values"""
+    for i in xrange(n):
+        query = Query(FilmDocument)
+        query.add_q(make_q(i))
+        str(query)
+
+
+def bound_queries(n):
+    """Render a prepared query with each of `n` sets of values"""
+    query = Query(FilmDocument)
+    query.add_q(param_q())
+    template = query.prepare()
+    for i in xrange(n):
+        template.render({
+            'title': 'die hard %d' % i, 'rating': i / 10.0, 'votes': i
+        })
+
+
+def report(name, fn, *args):
+    best = min(timeit.repeat(lambda: fn(*args), number=1, repeat=REPEAT))
+    print "%-45s %8.2f ms" % (name, best * 1000)
+
+
+def main():
+    for query_class in (LegacyQuery, Query):
+        name = query_class.__name__
+        report("%s: 200 chained filters" % name, chained_filters, query_class, 200)
+
+        query = query_class(FilmDocument)
+        query.add_q(balanced_tree(8))
+        report("%s: 256 leaf tree, 100 times" % name, repeated_str, query, 100)
+
+    report("Query: 1000 fresh queries", fresh_queries, 1000)
+    report("Query: 1000 bound prepared queries", bound_queries, 1000)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Micro-benchmarks for constructing documents from 1000-document pages of
+search results.
+
+Compares the trusted decode path that `construct_document` uses by default
+with the validating path (`trusted=False`), with lazy construction when
+only a few fields are read, and with decoding a whole page at once with
+`construct_documents` (which uses NumPy for the number fields if it's
+installed). Also times `construct_values`, which `SearchQuery.values_list`
+uses to skip constructing documents altogether. Run from the repository root
+with the App Engine SDK on the path:
+
+    python benchmarks/bench_results.py
+"""
+import datetime
+import timeit
+
+from google.appengine.api import search as search_api
+
+from search import fields, indexers, timezone
+from search.indexes import DocumentModel
+from search.query import construct_document, construct_documents, construct_values
+
+
+N = 1000
+REPEAT = 5
+
+
+class FilmDocument(DocumentModel):
+    title = fields.TextField()
+    description = fields.TextField(indexer=indexers.contains)
+    rating = fields.FloatField()
+    votes = fields.IntegerField()
+    released = fields.DateField()
+    updated = fields.TZDateTimeField()
+    available = fields.BooleanField()
+
+
+def make_page():
+    updated = timezone.datetime_to_timestamp(datetime.datetime(2017, 1, 1, 12))
+    return [
+        search_api.ScoredDocument(
+            doc_id='film-%d' % i,
+            fields=[
+                search_api.TextField(name='title', value=u'Die Hard %d' % i),
+                search_api.TextField(name='description', value=u'di die har hard'),
+                search_api.NumberField(name='rating', value=9.7),
+                search_api.NumberField(name='votes', value=i),
+                search_api.DateField(name='released', value=datetime.date(1989, 2, 3)),
+                search_api.NumberField(name='updated', value=updated),
+                search_api.NumberField(name='available', value=1),
+            ]
+        )
+        for i in xrange(N)
+    ]
+
+
+def construct(page, **kwargs):
+    for d in page:
+        construct_document(FilmDocument, d, **kwargs)
+
+
+def construct_bulk(page, **kwargs):
+    construct_documents(FilmDocument, page, **kwargs)
+
+
+def values_three(page):
+    construct_values(FilmDocument, page, ['title', 'rating', 'updated'])
+
+
+def construct_and_read_three(page, **kwargs):
+    for d in page:
+        doc = construct_document(FilmDocument, d, **kwargs)
+        doc.title, doc.rating, doc.updated
+
+
+def report(name, fn, *args, **kwargs):
+    best = min(timeit.repeat(lambda: fn(*args, **kwargs), number=1, repeat=REPEAT))
+    print "%-45s %8.2f ms / %d docs" % (name, best * 1000, N)
+
+
+def main():
+    page = make_page()
+
+    report("validated: construct", construct, page, trusted=False)
+    report("trusted: construct", construct, page)
+    report("trusted: construct page in bulk", construct_bulk, page)
+    report("validated: construct, read 3 fields", construct_and_read_three, page, trusted=False)
+    report("trusted: construct, read 3 fields", construct_and_read_three, page)
+    report("lazy: construct, read 3 fields", construct_and_read_three, page, lazy=True)
+    report("values: 3 fields", values_three, page)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+"""Columnar export of search results to NumPy arrays, see
+`SearchQuery.to_arrays`.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from . import fields
+
+
+def raw_numbers(field, raw_values):
+    """Convert the raw values of a number-like field to a float array, along
+    with a boolean array marking the missing values.
+    """
+    none_value = field.none_value()
+    array = numpy.array(
+        [none_value if value is None else value for value in raw_values],
+        dtype=numpy.float64
+    )
+    return array, array == none_value
+
+
+class Column(object):
+    """A growable array that the values of one field from each page of results
+    are appended to.
+
+    The array starts off with room for `capacity` values and doubles in size
+    whenever it runs out, so the values are only ever copied a handful of
+    times, however many pages there are.
+    """
+    dtype = object
+    # The value used for missing values, or `None` to mask them instead
+    fill_value = None
+
+    def __init__(self, field, capacity):
+        self.field = field
+        self.size = 0
+        self.data = numpy.empty(capacity, dtype=self.dtype)
+        self.mask = numpy.zeros(capacity, dtype=numpy.bool_)
+
+    def convert(self, raw_values):
+        """Convert a page of raw Search API values to an array of this
+        column's dtype, and a boolean array marking the missing values.
+        """
+        present = [i for i, value in enumerate(raw_values) if value is not None]
+        array = numpy.empty(len(raw_values), dtype=object)
+        decoded = self.field.from_search_values([raw_values[i] for i in present])
+        for i, value in zip(present, decoded):
+            array[i] = value
+
+        missing = numpy.ones(len(raw_values), dtype=numpy.bool_)
+        missing[present] = False
+        return array, missing
+
+    def grow(self, needed):
+        capacity = len(self.data)
+        if needed <= capacity:
+            return
+
+        capacity = max(needed, capacity * 2)
+        data = numpy.empty(capacity, dtype=self.dtype)
+        data[:self.size] = self.data[:self.size]
+        mask = numpy.zeros(capacity, dtype=numpy.bool_)
+        mask[:self.size] = self.mask[:self.size]
+        self.data, self.mask = data, mask
+
+    def append(self, raw_values):
+        values, missing = self.convert(raw_values)
+        end = self.size + len(values)
+        self.grow(end)
+
+        if self.fill_value is not None:
+            values[missing] = self.fill_value
+        self.data[self.size:end] = values
+        self.mask[self.size:end] = missing
+        self.size = end
+
+    def get_array(self):
+        data = self.data[:self.size]
+        if self.fill_value is not None or self.dtype is object:
+            return data
+        return numpy.ma.MaskedArray(data, mask=self.mask[:self.size])
+
+
+class FloatColumn(Column):
+    dtype = numpy and numpy.float64
+    fill_value = numpy and numpy.nan
+
+    def convert(self, raw_values):
+        return raw_numbers(self.field, raw_values)
+
+
+class IntegerColumn(Column):
+    dtype = numpy and numpy.int64
+
+    def convert(self, raw_values):
+        array, missing = raw_numbers(self.field, raw_values)
+        array[missing] = 0
+        return array.astype(self.dtype), missing
+
+
+class BooleanColumn(IntegerColumn):
+    dtype = numpy and numpy.bool_
+
+
+class DateTimeColumn(Column):
+    """Datetimes are kept as naive UTC `datetime64` values, which is what
+    both `DateTimeField` and `TZDateTimeField` values are indexed as.
+    """
+    dtype = 'datetime64[s]'
+    fill_value = numpy and numpy.datetime64('NaT')
+
+    def convert(self, raw_values):
+        array, missing = raw_numbers(self.field, raw_values)
+        array[missing] = 0
+        return array.astype(numpy.int64).astype(self.dtype), missing
+
+
+class DateColumn(Column):
+    dtype = 'datetime64[D]'
+    fill_value = numpy and numpy.datetime64('NaT')
+
+    def convert(self, raw_values):
+        none_value = self.field.none_value()
+        values = [none_value if value is None else value for value in raw_values]
+        array = numpy.array(values, dtype=self.dtype)
+        return array, array == numpy.datetime64(none_value, 'D')
+
+
+def get_column_class(field):
+    # Order matters, `TZDateTimeField` is a `DateTimeField`, etc.
+    for field_class, column_class in (
+            (fields.FloatField, FloatColumn),
+            (fields.IntegerField, IntegerColumn),
+            (fields.BooleanField, BooleanColumn),
+            (fields.DateTimeField, DateTimeColumn),
+            (fields.DateField, DateColumn)):
+        if isinstance(field, field_class):
+            return column_class
+    return Column
+
+
+def to_arrays(query, field_names, page_size):
+    """Get a NumPy array of the values of each of `field_names` for every
+    result of `query`, fetching `page_size` results at a time with cursors.
+    See `SearchQuery.to_arrays`.
+    """
+    if numpy is None:
+        raise ImportError('NumPy is required to export search results to arrays')
+
+    document_fields = query.document_class._meta.fields
+    columns = [
+        get_column_class(document_fields[name])(document_fields[name], page_size)
+        for name in field_names
+    ]
+
+    page = query.only(*field_names)
+    page.ids_only = False
+    page._values_type = None
+    page._set_limits(0, page_size)
+    page = page.set_cursor(query._cursor)
+
+    while True:
+        page._run_chunk_query()
+        results = page._results_response.results
+        raws = [{f.name: f.value for f in document.fields} for document in results]
+
+        for name, column in zip(field_names, columns):
+            column.append([raw.get(name) for raw in raws])
+
+        cursor = page.next_cursor
+        if not cursor or len(results) < page_size:
+            break
+        page = page.set_cursor(cursor)
+
+    return dict(
+        (name, column.get_array()) for name, column in zip(field_names, columns)
+    )
@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .utils import wait_all
+
+
+# The Search API accepts at most 200 documents in a single put or delete call
+MAX_BATCH_SIZE = 200
+
+
+_local = threading.local()
+
+
+def get_write_buffer():
+    """Get the write buffer that's currently collecting index writes for this
+    thread, or `None` if index writes should be sent straight away.
+    """
+    buffers = getattr(_local, 'buffers', None)
+    return buffers[-1] if buffers else None
+
+
+class _Delete(object):
+    """Marker for a pending delete in a `WriteBuffer`"""
+    pass
+
+
+class WriteBuffer(object):
+    """Collects `Index.put` and `Index.delete` calls made while it's open and
+    sends them to the Search API in batches, rather than making one RPC for
+    each call.
+
+    Writes are held per index and per doc ID, so that only the last operation
+    for a document is sent, e.g. a put followed by a delete for the same
+    document only results in the delete. Pending writes are sent when:
+
+        * `max_size` writes are pending for a single index
+        * `max_delay` seconds have passed since the oldest pending write for
+          an index. This is only checked when another write is made, so the
+          last writes are held until the buffer is flushed or closed however
+          long that takes
+        * the buffer is closed (or its `with` block exits)
+
+    >>> with WriteBuffer():
+    ...     for film in films:
+    ...         index.put(film)  # Nothing is sent yet
+    ...
+    >>> # All the films have now been put, 200 at a time
+    """
+    def __init__(self, max_size=MAX_BATCH_SIZE, max_delay=None):
+        self.max_size = min(max_size, MAX_BATCH_SIZE)
+        self.max_delay = max_delay
+
+        # Index name -> (index object, OrderedDict of doc ID -> document or
+        # `_Delete`)
+        self._pending = OrderedDict()
+        # Index name -> time of the oldest pending write for it
+        self._oldest = {}
+
+    def __len__(self):
+        return sum(len(ops) for _, ops in self._pending.values())
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def open(self):
+        """Start collecting index writes made on this thread"""
+        if not hasattr(_local, 'buffers'):
+            _local.buffers = []
+        _local.buffers.append(self)
+        return self
+
+    def close(self):
+        """Stop collecting index writes and send any that are pending"""
+        buffers = getattr(_local, 'buffers', [])
+        if self in buffers:
+            buffers.remove(self)
+        self.flush()
+
+    def _get_ops(self, index):
+        if index.name not in self._pending:
+            self._pending[index.name] = (index, OrderedDict())
+        return self._pending[index.name][1]
+
+    def _add(self, index, key, value):
+        ops = self._get_ops(index)
+        # Pop first so the document moves to the end of the queue
+        ops.pop(key, None)
+        ops[key] = value
+
+        now = time.time()
+        self._oldest.setdefault(index.name, now)
+
+        if len(ops) >= self.max_size:
+            self.flush_index(index.name)
+        if self.max_delay is not None:
+            for index_name, oldest in self._oldest.items():
+                if now - oldest >= self.max_delay:
+                    self.flush_index(index_name)
+
+    def put(self, index, documents):
+        """Queue `documents` to be put into `index`"""
+        for doc in documents:
+            # Documents without an ID get one from the Search API, so they
+            # can't be collapsed with any other write
+            self._add(index, doc.doc_id or object(), doc)
+
+    def delete(self, index, doc_ids):
+        """Queue the documents with `doc_ids` to be deleted from `index`"""
+        for doc_id in doc_ids:
+            self._add(index, doc_id, _Delete)
+
+    def flush_index(self, index_name):
+        """Send all pending writes for the index called `index_name`"""
+        index, ops = self._pending.pop(index_name, (None, None))
+        self._oldest.pop(index_name, None)
+        if not ops:
+            return
+
+        documents = [op for op in ops.values() if op is not _Delete]
+        doc_ids = [key for key, op in ops.items() if op is _Delete]
+
+        # Send every batch before waiting on any of them
+        futures = []
+        for i in xrange(0, len(doc_ids), MAX_BATCH_SIZE):
+            futures.append(index.delete_async(doc_ids[i:i + MAX_BATCH_SIZE]))
+        for i in xrange(0, len(documents), MAX_BATCH_SIZE):
+            futures.append(index.put_async(documents[i:i + MAX_BATCH_SIZE]))
+        try:
+            wait_all(futures)
+        finally:
+            index.invalidate_results()
+
+    def flush(self):
+        """Send all pending writes for every index"""
+        for index_name in list(self._pending):
+            self.flush_index(index_name)
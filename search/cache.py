@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResultCache(object):
+    """Keeps the Search API responses of the last `max_size` distinct queries
+    run in memory, so that running the same query again doesn't need an RPC.
+    See `SearchQuery.cache`.
+
+    Responses are kept for `timeout` seconds, or for the number of seconds in
+    `index_timeouts` for the name of the index the query was run on, if
+    given. Responses
+    without any results are kept for `empty_timeout` seconds instead, if
+    given (0 stops them being cached at all).
+
+    Indexes are identified by `index_key`, a tuple of their namespace and
+    name (see `utils.get_index_key`), so that indexes with the same name in
+    different namespaces never share responses.
+
+    Each index has a generation number, which `invalidate` bumps (see
+    `indexes.Index`, which invalidates its result cache whenever documents
+    are put or deleted). Responses are only used while the generation they
+    were cached for is still current, so invalidating an index never needs
+    to look through its cached responses.
+
+    The number of cache hits and misses so far are kept in `hits` and
+    `misses`.
+    """
+    def __init__(self, max_size=1000, timeout=60, index_timeouts=None,
+            empty_timeout=None):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.index_timeouts = index_timeouts or {}
+        self.empty_timeout = empty_timeout
+
+        self.hits = 0
+        self.misses = 0
+
+        # (index key, query key) -> (expiry time, generation, response)
+        self._responses = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._responses)
+
+    def get_timeout(self, index_key, response):
+        if self.empty_timeout is not None and not response.results:
+            return self.empty_timeout
+        return self.index_timeouts.get(index_key[1], self.timeout)
+
+    def get(self, index_key, key):
+        """Get the cached response for the query with `key` (see
+        `SearchQuery.get_cache_key`) on the index with `index_key`.
+
+        Returns a tuple of the response, or `None` if there isn't one, and
+        the index's current generation, to pass to `set` along with the
+        response once the query's been run.
+        """
+        cache_key = (index_key, key)
+        now = time.time()
+
+        with self._lock:
+            generation = self._generations.get(index_key, 0)
+            expires, cached_generation, response = self._responses.pop(
+                cache_key, (None, None, None)
+            )
+            if response is None or expires <= now or cached_generation != generation:
+                self.misses += 1
+                return None, generation
+
+            # Move it back to the most recently used end
+            self._responses[cache_key] = (expires, generation, response)
+            self.hits += 1
+            return response, generation
+
+    def set(self, index_key, key, response, generation):
+        """Cache `response`, the response to the query with `key` on the
+        index with `index_key`, if `generation` (as returned by `get` before
+        the query was run) is still current.
+        """
+        timeout = self.get_timeout(index_key, response)
+        if not timeout:
+            return
+
+        with self._lock:
+            # The index changed while the query was being run
+            if generation != self._generations.get(index_key, 0):
+                return
+
+            cache_key = (index_key, key)
+            self._responses.pop(cache_key, None)
+            self._responses[cache_key] = (
+                time.time() + timeout, generation, response
+            )
+
+            while len(self._responses) > self.max_size:
+                self._responses.popitem(last=False)
+
+    def invalidate(self, index_key):
+        """Stop the responses cached for every query on the index with
+        `index_key` being used.
+        """
+        with self._lock:
+            self._generations[index_key] = self._generations.get(index_key, 0) + 1
+
+    def clear(self):
+        """Forget every cached response, and reset the hit and miss counts"""
+        with self._lock:
+            self._responses.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._responses),
+        }
+
+
+# The cache used by `SearchQuery.cache()` when no other cache is given
+default_result_cache = ResultCache()
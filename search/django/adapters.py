@@ -141,17 +141,15 @@ class SearchQueryAdapter(object):
         if not _q.children:
             return None
 
-        q = SearchQ()
-        q.conn = _q.connector
-        q.children = filter(
+        children = filter(
             lambda x: x is not None,
-            map(cls. model_q_to_search_q, _q.children)
+            map(cls.model_q_to_search_q, _q.children)
         )
-        q.inverted = _q.negated
-
-        if not q.children:
+        if not children:
             return None
 
+        q = SearchQ.create(children, conn=_q.connector, inverted=_q.negated)
+
         # TODO: handle negation?
 
         return q
@@ -291,14 +289,101 @@ class SearchQueryAdapter(object):
     def count(self):
         return 0 if self._is_none else len(self._query)
 
+    def exists(self):
+        return False if self._is_none else self._query.exists()
+
+    def first(self):
+        return None if self._is_none else self._query.first()
+
     def order_by(self, *fields):
         qs = self._query.order_by(*fields)
         clone = self._clone()
         clone._query = qs
         return clone
 
+    def after(self, doc_or_sort_values, tie_breaker=None):
+        """Page after the given document or sort values, see
+        `SearchQuery.after`
+        """
+        clone = self._clone()
+        clone._query = self._query.after(doc_or_sort_values, tie_breaker)
+        return clone
+
+    def prepare(self):
+        """Compile the query with `ql.Param`s in place of some filter values,
+        see `SearchQuery.prepare`
+        """
+        clone = self._clone()
+        clone._query = self._query.prepare()
+        return clone
+
+    def bind(self, **params):
+        """Get a copy of this prepared query with the given values for its
+        parameters, see `SearchQuery.bind`
+        """
+        clone = self._clone()
+        clone._query = self._query.bind(**{
+            name: resolve_filter_value(value) for name, value in params.iteritems()
+        })
+        return clone
+
     def keywords(self, query_string):
         qs = self._query.keywords(query_string)
         clone = self._clone()
         clone._query = qs
         return clone
+
+    def only(self, *fields):
+        """Only return the given fields of each document from the Search API,
+        see `SearchQuery.only`. The `pk` field is always returned, since it's
+        needed to look up the model objects.
+        """
+        if fields and 'pk' not in fields:
+            fields += ('pk',)
+        clone = self._clone()
+        clone._query = self._query.only(*fields)
+        return clone
+
+    def defer(self, *fields):
+        """Don't return the given fields of each document from the Search API,
+        see `SearchQuery.defer`. The `pk` field can't be deferred.
+        """
+        clone = self._clone()
+        if fields == ('pk',):
+            clone._query = self._query._clone()
+        else:
+            clone._query = self._query.defer(*[f for f in fields if f != 'pk'])
+        return clone
+
+    def cache(self, result_cache=None):
+        """Cache the search results, see `SearchQuery.cache`"""
+        clone = self._clone()
+        clone._query = self._query.cache(result_cache)
+        return clone
+
+    def facets(self, *facets, **options):
+        """Get facet results along with the search results, see
+        `SearchQuery.facets`
+        """
+        clone = self._clone()
+        clone._query = self._query.facets(*facets, **options)
+        return clone
+
+    def refine(self, **refinements):
+        """Only match documents with the given facet values, see
+        `SearchQuery.refine`
+        """
+        clone = self._clone()
+        clone._query = self._query.refine(**refinements)
+        return clone
+
+    def get_facets(self):
+        return {} if self._is_none else self._query.get_facets()
+
+    def prefetch(self, enabled=True):
+        """Search for the next page of results ahead of time, see
+        `SearchQuery.prefetch`
+        """
+        clone = self._clone()
+        clone._query = self._query.prefetch(enabled)
+        return clone
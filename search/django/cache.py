@@ -0,0 +1,113 @@
+import hashlib
+import random
+
+from django.core.cache import caches
+
+
+class DjangoResultCache(object):
+    """Keeps the Search API responses to queries in a Django cache, so that
+    they're shared between instances. See `search.cache.ResultCache` for the
+    in-process equivalent, which takes the same timeout arguments.
+
+    Like `ResultCache`, indexes are identified by their namespace and name,
+    which are both part of every cache key. Each index has a generation
+    number kept in the cache alongside the responses, which `invalidate`
+    increments. Responses are stored with the generation they were cached
+    for, and fetched together with the current generation in a single
+    `get_many`, so they stop being used as soon as any instance changes the
+    index. A generation that's missing from the
+    cache (never set, or evicted) starts again from a random number rather
+    than from 0, so that responses cached for an evicted generation don't
+    become valid again.
+
+    Hits and misses are only counted per instance.
+    """
+    def __init__(self, cache_alias='default', key_prefix='search:results:',
+            timeout=60, index_timeouts=None, empty_timeout=None):
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        self.index_timeouts = index_timeouts or {}
+        self.empty_timeout = empty_timeout
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get_timeout(self, index_key, response):
+        if self.empty_timeout is not None and not response.results:
+            return self.empty_timeout
+        return self.index_timeouts.get(index_key[1], self.timeout)
+
+    def get_generation_key(self, index_key):
+        return "{}generation:{}:{}".format(self.key_prefix, *index_key)
+
+    def new_generation(self):
+        return random.getrandbits(48)
+
+    def start_generation(self, generation_key):
+        """Add a new generation for `generation_key` if it's missing, and
+        return the current one.
+        """
+        generation = self.new_generation()
+        # The generation has to live for as long as any response cached for it
+        if not self.cache.add(generation_key, generation, timeout=None):
+            generation = self.cache.get(generation_key, generation)
+        return generation
+
+    def get_response_key(self, index_key, key):
+        # Query keys can be longer than cache backends allow, so hash them
+        namespace, index_name = index_key
+        return "{}{}:{}:{}".format(
+            self.key_prefix,
+            namespace,
+            index_name,
+            hashlib.sha1(repr(key)).hexdigest()
+        )
+
+    def get(self, index_key, key):
+        generation_key = self.get_generation_key(index_key)
+        response_key = self.get_response_key(index_key, key)
+
+        found = self.cache.get_many([generation_key, response_key])
+        generation = found.get(generation_key)
+        if generation is None:
+            generation = self.start_generation(generation_key)
+        cached_generation, response = found.get(response_key, (None, None))
+
+        if response is None or cached_generation != generation:
+            self.misses += 1
+            return None, generation
+
+        self.hits += 1
+        return response, generation
+
+    def set(self, index_key, key, response, generation):
+        timeout = self.get_timeout(index_key, response)
+        if not timeout:
+            return
+
+        self.cache.set(
+            self.get_response_key(index_key, key),
+            (generation, response),
+            timeout=timeout
+        )
+
+    def invalidate(self, index_key):
+        generation_key = self.get_generation_key(index_key)
+
+        self.start_generation(generation_key)
+        try:
+            self.cache.incr(generation_key)
+        except ValueError:
+            # Evicted since it was added
+            self.cache.set(generation_key, self.new_generation(), timeout=None)
+
+    def get_stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+        }
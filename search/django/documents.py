@@ -99,21 +99,21 @@ class DynamicDocumentFactory(object):
         self.model_class = model_class
 
     def create(self):
-        document_class = type(
+        # The fields go in the class body so that `MetaClass` sets them up
+        # like any other declared field
+        attrs = {'_doc_meta': self.meta}
+        attrs.update(self.build_fields())
+
+        return type(
             '{model_class.__name__}Document'.format(model_class=self.model_class),
             (DynamicDocument,),
-            {'_doc_meta': self.meta}
+            attrs
         )
-        self.build_fields(document_class)
-        return document_class
 
-    def build_fields(self, new_cls):
+    def build_fields(self):
         for field_name in self.meta.field_names:
-            field = self.get_field(field_name)
-
-            field.add_to_class(new_cls, field_name)
-            self.meta.fields[field_name] = field
-            new_cls._meta.fields[field_name] = field
+            self.meta.fields[field_name] = self.get_field(field_name)
+        return self.meta.fields
 
     def get_field(self, field_name):
         django_field = None
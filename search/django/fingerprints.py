@@ -0,0 +1,32 @@
+from django.core.cache import caches
+
+
+class CacheFingerprintStore(object):
+    """Keeps document fingerprints in a Django cache, so that they're shared
+    between instances. See `search.fingerprints.LRUFingerprintStore` for the
+    in-process equivalent.
+    """
+    def __init__(self, cache_alias='default', key_prefix='search:fingerprint:', timeout=None):
+        self.cache_alias = cache_alias
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def get_many(self, keys):
+        found = self.cache.get_many([self.key_prefix + key for key in keys])
+        return {
+            key[len(self.key_prefix):]: fingerprint
+            for key, fingerprint in found.items()
+        }
+
+    def set_many(self, mapping):
+        self.cache.set_many(
+            {self.key_prefix + key: fingerprint for key, fingerprint in mapping.items()},
+            timeout=self.timeout
+        )
+
+    def delete_many(self, keys):
+        self.cache.delete_many([self.key_prefix + key for key in keys])
@@ -1,5 +1,5 @@
 from .registry import registry
-from .utils import get_rank
+from .utils import get_fingerprint_store, get_rank, get_result_cache
 
 from ..indexes import Index
 
@@ -21,7 +21,11 @@ def index_instance(instance):
             _rank=get_rank(instance, rank=rank)
         )
         doc.build_base(instance)
-        index = Index(index_name)
+        index = Index(
+            index_name,
+            fingerprint_store=get_fingerprint_store(),
+            result_cache=get_result_cache()
+        )
         index.put(doc)
 
         return True
@@ -34,5 +38,9 @@ def unindex_instance(instance):
     if search_meta:
         index_name = search_meta[0]
 
-        index = Index(index_name)
+        index = Index(
+            index_name,
+            fingerprint_store=get_fingerprint_store(),
+            result_cache=get_result_cache()
+        )
         index.delete(str(instance.pk))
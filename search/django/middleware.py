@@ -0,0 +1,49 @@
+from django.conf import settings
+
+from ..buffer import MAX_BATCH_SIZE, WriteBuffer
+from ..singleflight import SearchScope
+
+
+def close_request_attr(request, name):
+    """Close the write buffer or search scope kept as `name` on `request` by
+    a middleware's `process_request`, if there is one. There might not be,
+    since `process_request` isn't called if a middleware before that one
+    returned a response.
+    """
+    opened = getattr(request, name, None)
+    if opened is not None:
+        delattr(request, name)
+        opened.close()
+
+
+class WriteBufferMiddleware(object):
+    """Collect all search index writes made while handling a request (e.g. by
+    the `post_save` and `post_delete` receivers added by `@searchable`) and
+    send them in batches when the request ends.
+
+    The batch size and maximum delay before sending can be configured with the
+    `SEARCH_WRITE_BUFFER_SIZE` and `SEARCH_WRITE_BUFFER_DELAY` settings.
+    """
+    def process_request(self, request):
+        request._search_write_buffer = WriteBuffer(
+            max_size=getattr(settings, 'SEARCH_WRITE_BUFFER_SIZE', MAX_BATCH_SIZE),
+            max_delay=getattr(settings, 'SEARCH_WRITE_BUFFER_DELAY', None),
+        ).open()
+
+    def process_response(self, request, response):
+        close_request_attr(request, '_search_write_buffer')
+        return response
+
+
+class SearchScopeMiddleware(object):
+    """Deduplicate the searches run while handling a request, so that e.g. a
+    paginator and a template running the same search only make one RPC, and
+    identical searches running on other threads are waited on rather than
+    sent again. See `search.singleflight.SearchScope`.
+    """
+    def process_request(self, request):
+        request._search_scope = SearchScope().open()
+
+    def process_response(self, request, response):
+        close_request_attr(request, '_search_scope')
+        return response
@@ -29,8 +29,21 @@ class SearchPage(django_paginator.Page, IsSearchingMixin):
 
 
 class SearchPaginator(django_paginator.Paginator, IsSearchingMixin):
+    """Paginator for `SearchQueryAdapter`s (or anything else a Django
+    paginator takes).
+
+    With `prefetch=True`, the search for the page after each page fetched is
+    started straight away (see `SearchQuery.prefetch`), so that it's ready
+    if it's asked for later in the same request. This needs
+    `search.django.middleware.SearchScopeMiddleware`.
+    """
     _page = None
 
+    def __init__(self, object_list, per_page, prefetch=False, **kwargs):
+        super(SearchPaginator, self).__init__(object_list, per_page, **kwargs)
+        if prefetch and self.is_searching():
+            self.object_list = self.object_list.prefetch()
+
     def _get_page(self, *args, **kwargs):
         return SearchPage(*args, **kwargs)
 
@@ -67,7 +67,7 @@ class SearchMixin(object):
 
         if self.is_searching():
             # patch the raw query onto the object for get_paginated_response to use
-            self._raw_query = str(queryset._query.query)
+            self._raw_query = queryset._query.get_query_string()
 
         if page is not None:
             serializer = self.get_serializer(page, many=True)
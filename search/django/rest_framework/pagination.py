@@ -9,7 +9,12 @@ from ..paginator import SearchPaginator
 class SearchPageNumberPagination(drf_pagination.PageNumberPagination):
     """Override the DRF paginator purely in order to hook up our SearchPaginator
     in place of the DjangoPaginator.
+
+    Set `prefetch_next_page` to start searching for the next page as soon as
+    each page is fetched, see `SearchQuery.prefetch`.
     """
+    prefetch_next_page = False
+
     def paginate_queryset(self, queryset, request, view=None):
         self._handle_backwards_compat(view)
 
@@ -17,7 +22,11 @@ class SearchPageNumberPagination(drf_pagination.PageNumberPagination):
         if not page_size:
             return None
 
-        paginator = SearchPaginator(queryset, page_size)
+        paginator = SearchPaginator(
+            queryset,
+            page_size,
+            prefetch=self.prefetch_next_page
+        )
         page_number = request.query_params.get(self.page_query_param, 1)
 
         if page_number in self.last_page_strings:
@@ -8,10 +8,11 @@ from django.conf import settings
 
 from djangae.contrib.mappers.pipes import MapReduceTask
 
-from ..indexes import Index
+from ..indexes import Index, wait_all
 
 from .indexes import get_index_for_doc, index_instance
 from .registry import registry
+from .utils import get_fingerprint_store, get_result_cache
 
 
 # We can delete up to 200 search documents in one RPC call.
@@ -87,15 +88,15 @@ def batch_delete_docs(index, doc_ids, batch_size=None):
 
     for i in xrange(0, len(doc_ids), batch_size):
         batch = doc_ids[i:i+batch_size]
-        # index._index refers the underlying GAE search api index object which
-        # exposes the async delete method.
-        delete_rpc_operations.append(index._index.delete_async(batch))
+        delete_rpc_operations.append(index.delete_async(batch))
         logger.info(u'Removing doc_ids %r', batch)
 
     # Not sure we really need to block for the results of the delete operations
     # but just incase..
-    for fut in delete_rpc_operations:
-        fut.get_result()
+    try:
+        wait_all(delete_rpc_operations)
+    finally:
+        index.invalidate_results()
 
     logger.info(u'Removed doc_ids %r', batch)
 
@@ -105,13 +106,17 @@ def purge_index_for_model(model, batch_size=None):
     search_meta = registry.get(model)
     index_name = search_meta[0]
 
-    index = Index(index_name)
+    index = Index(
+        index_name,
+        fingerprint_store=get_fingerprint_store(),
+        result_cache=get_result_cache()
+    )
     doc_ids = index.get_range(limit=batch_size, ids_only=True)
 
     if doc_ids:
         target = get_deferred_target()
         deferred.defer(
-            purge_index_for_model, doc_class,
+            purge_index_for_model, model,
             batch_size=batch_size,
             _target=target,
         )
@@ -166,7 +171,11 @@ def remove_orphaned_docs_for_app_model(app_label, model_name, start_id=None, bat
     search_meta = registry.get(model)
     index_name = search_meta[0]
 
-    index = Index(index_name)
+    index = Index(
+        index_name,
+        fingerprint_store=get_fingerprint_store(),
+        result_cache=get_result_cache()
+    )
     doc_ids = index.get_range(
         ids_only=True,
         start_id=start_id,
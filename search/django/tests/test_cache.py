@@ -0,0 +1,61 @@
+from djangae.test import TestCase
+
+from ...fields import TextField
+from ...indexes import DocumentModel, Index
+from ..cache import DjangoResultCache
+
+
+class FakeDocument(DocumentModel):
+    foo = TextField()
+
+
+class TestDjangoResultCache(TestCase):
+    def test_generation_invalidation(self):
+        result_cache = DjangoResultCache(key_prefix='test:results:')
+        idx = Index('dummy', FakeDocument, result_cache=result_cache)
+        idx.put(FakeDocument(doc_id='a', foo='thing'))
+
+        self.assertEqual([d.doc_id for d in idx.search()], ['a'])
+        self.assertEqual([d.doc_id for d in idx.search()], ['a'])
+        self.assertEqual((result_cache.hits, result_cache.misses), (1, 1))
+
+        # A separate instance sharing the cache sees the cached response...
+        other_cache = DjangoResultCache(key_prefix='test:results:')
+        other_idx = Index('dummy', FakeDocument, result_cache=other_cache)
+        self.assertEqual([d.doc_id for d in other_idx.search()], ['a'])
+        self.assertEqual(other_cache.hits, 1)
+
+        # ...and stops using it as soon as the index changes anywhere
+        idx.put(FakeDocument(doc_id='b', foo='thing2'))
+        self.assertEqual(
+            sorted(d.doc_id for d in other_idx.search()),
+            ['a', 'b']
+        )
+        self.assertEqual(other_cache.misses, 1)
+
+        idx.delete('a')
+        self.assertEqual([d.doc_id for d in other_idx.search()], ['b'])
+
+    def test_evicted_generation(self):
+        result_cache = DjangoResultCache(key_prefix='test:results:')
+        idx = Index('dummy', FakeDocument, result_cache=result_cache)
+        idx.put(FakeDocument(doc_id='a', foo='thing'))
+        self.assertEqual([d.doc_id for d in idx.search()], ['a'])
+
+        # Responses cached before the generation was evicted aren't used
+        result_cache.cache.delete(result_cache.get_generation_key(('', 'dummy')))
+        self.assertEqual([d.doc_id for d in idx.search()], ['a'])
+        self.assertEqual((result_cache.hits, result_cache.misses), (0, 2))
+
+    def test_namespaces(self):
+        result_cache = DjangoResultCache(key_prefix='test:results:')
+        idx = Index('dummy', FakeDocument, result_cache=result_cache)
+        idx.put(FakeDocument(doc_id='a', foo='thing'))
+        other_idx = Index(
+            'dummy', FakeDocument, result_cache=result_cache, namespace='other'
+        )
+        other_idx.put(FakeDocument(doc_id='b', foo='thing'))
+
+        self.assertEqual([d.doc_id for d in idx.search()], ['a'])
+        self.assertEqual([d.doc_id for d in other_idx.search()], ['b'])
+        self.assertEqual((result_cache.hits, result_cache.misses), (0, 2))
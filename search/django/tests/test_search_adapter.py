@@ -2,7 +2,11 @@ import unittest
 from django.db import models
 from djangae.test import TestCase
 
+from ...errors import FieldNotLoadedError
+from ...ql import Param
+from ...singleflight import SearchScope
 from ..adapters import SearchQueryAdapter
+from ..paginator import SearchPaginator
 from .models import Foo, FooWithMeta
 
 
@@ -78,6 +82,43 @@ class TestSearchQueryAdapter(TestCase):
 
         self.assertEqual(1, search_qs.count())
 
+    def test_defer_corpus(self):
+        FooWithMeta.objects.create(name='Donald Duck')
+
+        qs = FooWithMeta.objects.all()
+        search_qs = SearchQueryAdapter.from_queryset(qs).defer('corpus', 'pk')
+
+        doc = list(search_qs)[0]
+        self.assertEqual(doc.name, 'Donald Duck')
+        self.assertRaises(FieldNotLoadedError, getattr, doc, 'corpus')
+        self.assertSameList(qs, search_qs.as_model_objects())
+
+    def test_prepare_bind(self):
+        for name in ['Tom', 'John', 'Joan']:
+            FooWithMeta.objects.create(name=name)
+
+        search_qs = SearchQueryAdapter.from_queryset(FooWithMeta.objects.all())
+        by_name = search_qs.filter(name=Param('name')).prepare()
+
+        self.assertSameList(
+            FooWithMeta.objects.filter(name='Joan'),
+            by_name.bind(name='Joan')
+        )
+        self.assertEqual(by_name.bind(name='Tom').count(), 1)
+
+    def test_paginator_prefetch(self):
+        for name in ['Tom', 'John', 'Joan']:
+            FooWithMeta.objects.create(name=name)
+
+        search_qs = SearchQueryAdapter.from_queryset(FooWithMeta.objects.all())
+        paginator = SearchPaginator(search_qs, 2, prefetch=True)
+
+        with SearchScope() as scope:
+            self.assertEqual(len(list(paginator.page(1))), 2)
+            self.assertEqual(len(scope.prefetched), 1)
+            self.assertEqual(len(list(paginator.page(2))), 1)
+            self.assertEqual(len(scope.prefetched), 0)
+
     @unittest.skip("TODO")
     def test_ordering_copied(self):
         asc_qs = FooWithMeta.objects.order_by('name')
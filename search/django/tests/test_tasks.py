@@ -0,0 +1,25 @@
+from django.test.utils import override_settings
+from djangae.test import TestCase
+
+from ...indexes import Index
+from ..indexes import index_instance
+from ..registry import registry
+from ..tasks import purge_index_for_model
+from .models import Foo
+
+
+class TestPurge(TestCase):
+    @override_settings(
+        SEARCH_FINGERPRINT_STORE='search.fingerprints.LRUFingerprintStore'
+    )
+    def test_purge_then_reindex(self):
+        foo = Foo.objects.create(name='David')
+        index = Index(registry.get(Foo)[0])
+        self.assertEqual(index.get_range(ids_only=True), [str(foo.pk)])
+
+        purge_index_for_model(Foo)
+        self.assertEqual(index.get_range(ids_only=True), [])
+
+        # The purge forgot the document's fingerprint, so it's put again
+        index_instance(foo)
+        self.assertEqual(index.get_range(ids_only=True), [str(foo.pk)])
@@ -2,6 +2,7 @@ import logging
 import threading
 
 from django.conf import settings
+from django.utils.module_loading import import_string
 
 try:
     from text_unidecode import unidecode
@@ -21,6 +22,10 @@ status = threading.local()
 
 MAX_RANK = 2 ** 31
 
+_fingerprint_stores = {}
+
+_result_caches = {}
+
 
 def get_ascii_string_rank(string, max_digits=9):
     """Convert a string into a number such that when the numbers are sorted
@@ -201,6 +206,48 @@ disable_indexing = DisableIndexing()
 enable_indexing = EnableIndexing()
 
 
+def get_fingerprint_store():
+    """Get the fingerprint store that `index_instance` should use to skip
+    putting documents that haven't changed, as configured by the dotted path
+    in the `SEARCH_FINGERPRINT_STORE` setting, e.g.:
+
+        SEARCH_FINGERPRINT_STORE = "search.django.fingerprints.CacheFingerprintStore"
+
+    Returns:
+        A fingerprint store instance, or `None` if the setting isn't set
+    """
+    path = getattr(settings, "SEARCH_FINGERPRINT_STORE", None)
+    if not path:
+        return None
+
+    # Shared between threads, so that an in-process store sees every put
+    if path not in _fingerprint_stores:
+        _fingerprint_stores[path] = import_string(path)()
+    return _fingerprint_stores[path]
+
+
+def get_result_cache():
+    """Get the cache that search results for registered models should be kept
+    in, as configured by the dotted path in the `SEARCH_RESULT_CACHE`
+    setting, e.g.:
+
+        SEARCH_RESULT_CACHE = "search.django.cache.DjangoResultCache"
+
+    `index_instance` and `unindex_instance` invalidate it for the model's
+    index, and queries from `get_search_query` use it.
+
+    Returns:
+        A result cache instance, or `None` if the setting isn't set
+    """
+    path = getattr(settings, "SEARCH_RESULT_CACHE", None)
+    if not path:
+        return None
+
+    if path not in _result_caches:
+        _result_caches[path] = import_string(path)()
+    return _result_caches[path]
+
+
 def get_datetime_field():
     return fields.TZDateTimeField if settings.USE_TZ else fields.DateTimeField
 
@@ -223,5 +270,5 @@ def get_search_query(model_class, ids_only=False):
         raise registry.RegisterError(u"This model isn't registered with @searchable")
 
     index_name, document_class, _ = search_meta
-    index = Index(index_name)
+    index = Index(index_name, result_cache=get_result_cache())
     return index.search(document_class=document_class, ids_only=ids_only)
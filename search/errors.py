@@ -16,3 +16,7 @@ class DocumentClassRequiredError(Error):
 
 class FieldError(Error):
     pass
+
+
+class FieldNotLoadedError(Error, AttributeError):
+    pass
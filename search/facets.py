@@ -0,0 +1,128 @@
+"""Faceted search, see `SearchQuery.facets`."""
+import re
+from collections import OrderedDict, namedtuple
+
+from google.appengine.api import search as search_api
+
+
+# A value of a facet in a query's facet results, along with the number of
+# matching documents with that value. `value` is the facet value converted
+# back to python by the facet's field, or a `(start, end)` tuple for range
+# facets, and `label` is the Search API's label for it.
+FacetValue = namedtuple('FacetValue', ['label', 'value', 'count'])
+
+
+RANGE_LABEL_REGEX = re.compile(r'^\[(.*),(.*)\)$')
+
+
+class Facet(object):
+    """An explicit request for a facet's values in a query's facet results,
+    for when the defaults aren't enough:
+
+    >>> query.facets(
+    ...     Facet('genre', value_limit=20),
+    ...     Facet('rating', ranges=[(None, 3), (3, 4), (4, None)]),
+    ... )
+
+    `values` and `ranges` are python values for the facet's field, and the
+    ends of ranges can be `None` to leave them open. Only number-like fields
+    can be counted by range.
+    """
+    def __init__(self, name, value_limit=None, values=None, ranges=None):
+        self.name = name
+        self.value_limit = value_limit
+        self.values = tuple(values) if values else None
+        self.ranges = tuple(tuple(r) for r in ranges) if ranges else None
+
+    def __repr__(self):
+        return 'Facet(%r)' % self.name
+
+    def get_key(self):
+        return (self.name, self.value_limit, self.values, self.ranges)
+
+    def to_search_api(self, field):
+        """Get the Search API `FacetRequest` for this facet, converting its
+        values with `field`, if it's a field of the document class.
+        """
+        values = ranges = None
+        if self.values:
+            values = [to_facet_value(field, value) for value in self.values]
+        if self.ranges:
+            ranges = [
+                search_api.FacetRange(
+                    start=to_facet_value(field, start),
+                    end=to_facet_value(field, end)
+                )
+                for start, end in self.ranges
+            ]
+        return search_api.FacetRequest(
+            self.name,
+            value_limit=self.value_limit,
+            values=values,
+            ranges=ranges
+        )
+
+
+def to_facet_value(field, value):
+    """Convert the python `value` of `field` to the value it's faceted as"""
+    if field is None or value is None:
+        return value
+    return field.to_facet_value(field.to_search_value(value))
+
+
+def parse_refinements(name, value):
+    """Split `value`, a value of the facet called `name`, a `(start, end)`
+    tuple for a range of values, or a list of either, into a list of
+    `(name, value, range)` tuples, one for each refinement.
+    """
+    if isinstance(value, list):
+        return [r for v in value for r in parse_refinements(name, v)]
+    if isinstance(value, tuple):
+        return [(name, None, value)]
+    return [(name, value, None)]
+
+
+def to_search_api_refinement(document_class, refinement):
+    """Get the Search API `FacetRefinement` for a refinement from
+    `parse_refinements`
+    """
+    name, value, value_range = refinement
+    field = document_class._meta.fields.get(name)
+
+    if value_range is not None:
+        start, end = value_range
+        return search_api.FacetRefinement(
+            name,
+            facet_range=search_api.FacetRange(
+                start=to_facet_value(field, start),
+                end=to_facet_value(field, end)
+            )
+        )
+    return search_api.FacetRefinement(name, value=to_facet_value(field, value))
+
+
+def decode_label(field, label):
+    """Convert a facet value's label to its python value"""
+    match = RANGE_LABEL_REGEX.match(label)
+    if match:
+        return tuple(
+            decode_label(field, end) if end else None for end in match.groups()
+        )
+    if field is None:
+        return label
+    return field.from_facet_value(label)
+
+
+def decode_facets(document_class, facet_results):
+    """Decode the Search API's `FacetResult`s to a dict of facet name to a
+    list of `FacetValue`s, in the order the Search API returned them.
+    """
+    document_fields = document_class._meta.fields
+    facets = OrderedDict()
+    for result in facet_results:
+        field = document_fields.get(result.name)
+        facets[result.name] = [
+            FacetValue(value.label, decode_label(field, value.label), value.count)
+            for value in result.values
+        ]
+    return facets
@@ -2,6 +2,11 @@ from datetime import date, datetime
 
 from google.appengine.api import search as search_api
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 from . import timezone
 from .errors import FieldError
 
@@ -14,11 +19,72 @@ MIN_SEARCH_API_INT = -MAX_SEARCH_API_INT
 MAX_SEARCH_API_FLOAT = float(MAX_SEARCH_API_INT)
 MIN_SEARCH_API_FLOAT = -MAX_SEARCH_API_FLOAT
 
+# The bulk conversion methods only use NumPy for at least this many values,
+# since for fewer, converting to and from arrays costs more than it saves
+NUMPY_MIN_VALUES = 50
+
 
 class NOT_SET(object):
     pass
 
 
+def use_numpy(values):
+    return numpy is not None and len(values) >= NUMPY_MIN_VALUES
+
+
+def numbers_to_search_values(field, values, cast, dtype):
+    """Bulk `to_search_value` for `FloatField` and `IntegerField`, where
+    `cast` is `float` or `int`, and `dtype` the equivalent NumPy type.
+    """
+    none_value = field.none_value()
+    minimum, maximum = field.minimum, field.maximum
+
+    # `Field.to_search_value` turns None into the none value or the default
+    values = [
+        Field.to_search_value(field, value) if value is None else value
+        for value in values
+    ]
+    values = [none_value if value is None else value for value in values]
+
+    if use_numpy(values):
+        array = numpy.array(values, dtype=dtype)
+        out_of_range = (array != none_value) & ((array < minimum) | (array > maximum))
+        if out_of_range.any():
+            raise ValueError('Value %s is outwith %s-%s'
+                % (array[out_of_range][0], minimum, maximum))
+        return array.tolist()
+
+    converted = []
+    append = converted.append
+    for value in values:
+        if value == none_value:
+            append(none_value)
+            continue
+
+        value = cast(value)
+        if value < minimum or value > maximum:
+            raise ValueError('Value %s is outwith %s-%s'
+                % (value, minimum, maximum))
+        append(value)
+    return converted
+
+
+def numbers_to_pythons(field, values, cast, dtype):
+    """Bulk `to_python` for number fields, where `cast` converts a single
+    value, and `dtype` is the NumPy type to convert a whole array to.
+    """
+    none_value = field.none_value()
+
+    if use_numpy(values):
+        array = numpy.asarray(values, dtype=numpy.float64)
+        converted = array.astype(dtype).tolist()
+        for i in numpy.flatnonzero(array == none_value):
+            converted[i] = None
+        return converted
+
+    return [None if value == none_value else cast(value) for value in values]
+
+
 class IndexedValue(unicode):
     pass
 
@@ -27,61 +93,87 @@ class Field(object):
     """Base field class. Responsible for converting the field's assigned value
     to an acceptable value for the search API and back to Python again.
 
-    There is some magic that happens upon setting/getting values on/from
-    properties that subclass `Field`. When setting a value, it is (validated)
-    and then converted to the search API value. When it's accessed, it's then
-    converted back to its python value. There's an extra step before setting
-    field values when instantiating document objects with search results, where
-    `field.prep_value_from_search` is called before setting the attribute. The
-    following information is offered as clarity on the process.
+    Fields are data descriptors on their document class. When setting a
+    value, it is (validated) and then converted to the search API value, which
+    is kept in the instance's `__dict__`. When it's accessed, it's then
+    converted back to its python value. Documents instantiated from search
+    results take a shortcut, described below. The following information is
+    offered as clarity on the process.
 
     A round trip for setting an attirbute is shown below:
 
     >>> obj.field = value
-    >>> obj.__setattr__('field', value)
+    >>> Field.__set__(obj._meta.fields['field'], obj, value)
     >>> new_value = obj._meta.fields['field'].to_search_value(value)
-    >>> obj.field = new_value
+    >>> obj.__dict__['field'] = new_value
 
-    If the document is being instantiated from search results, the ql.Query
-    adds an extra step, allowing you to prep the returned value before calling
-    `f.to_search_value` on it:
+    If the document is being instantiated from search results, the returned
+    values have already been validated, so `query.construct_document` skips
+    that journey and decodes them with `from_search_value` instead:
 
     >>> i.search('bla')
     >>> ...
-    >>> # in query.SearchQuery._run
-    >>> for d in results:
-    ...     for f in d.fields:
-    ...         new_value = d._meta.fields[f.name].prep_value_from_search(f.value)
-    ...         # setattr() then puts the new_value through the journey above
-    ...         setattr(d, f.name, new_value)
+    >>> # in query.construct_document
+    >>> for f in d.fields:
+    ...     value = d._meta.fields[f.name].from_search_value(f.value)
+    ...     # stored as-is on the result, with no `to_search_value` call
+
+    With `construct_document(..., trusted=False)`, the value is prepped with
+    `prep_value_from_search` and then set with `setattr()`, which puts it
+    through the journey above.
 
     Upon getting the field from the document object, the following process is
     invoked:
 
     >>> obj.field
-    >>> obj.__getattribute__('field')
-    >>> old_value = object.__getattribute__('field')
+    >>> Field.__get__(obj._meta.fields['field'], obj, type(obj))
+    >>> old_value = obj.__dict__['field']
     >>> obj._meta.fields['field'].to_python(old_value)
     'some value'
 
     Each Field sub-class must declare what class it uses from the search API by
     setting the Field.search_api_field attribute.
+
+    Fields declared with `facet=True` are also put as a facet of the same
+    name, using the class in `search_api_facet`, so that search results can
+    be counted by their value (see `SearchQuery.facets`).
     """
     search_api_field = None
+    search_api_facet = None
 
-    def __init__(self, default=NOT_SET, null=True):
+    def __init__(self, default=NOT_SET, null=True, facet=False):
         self.default = default
         self.null = null
+        self.facet = facet
+
+        if facet and self.search_api_facet is None:
+            raise FieldError(
+                '%s fields cannot be facets' % type(self).__name__
+            )
 
     def none_value(self):
         return None
 
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            value = instance.__dict__[self.name]
+        except KeyError:
+            raise AttributeError(self.name)
+        return self.to_python(value)
+
+    def __set__(self, instance, value):
+        instance.__dict__[self.name] = self.to_search_value(value)
+
     def add_to_class(self, cls, name):
         """Allows this field object to keep track of details about its
-        declaration on the owning document class.
+        declaration on the owning document class, and installs it on that
+        class as the descriptor for the field's attribute.
         """
         self.name = name
         self.cls_name = cls.__name__
+        setattr(cls, name, self)
 
     def to_search_value(self, value):
         """Convert the value to a value suitable for the search API"""
@@ -108,6 +200,30 @@ class Field(object):
         """
         return value
 
+    def from_search_value(self, value):
+        """Convert a value that came directly from the result of a search to
+        its python equivalent.
+
+        Values from the Search API were validated when they were put, so
+        unlike the `prep_value_from_search`, `to_search_value`, `to_python`
+        round trip, this doesn't validate them again.
+        """
+        return self.to_python(self.prep_value_from_search(value))
+
+    def to_search_values(self, values):
+        """Bulk version of `to_search_value`, converting a whole column of
+        values in one go. Returns a list.
+        """
+        return [self.to_search_value(value) for value in values]
+
+    def to_pythons(self, values):
+        """Bulk version of `to_python`. Returns a list."""
+        return [self.to_python(value) for value in values]
+
+    def from_search_values(self, values):
+        """Bulk version of `from_search_value`. Returns a list."""
+        return [self.from_search_value(value) for value in values]
+
     def prep_value_for_filter(self, value, **kwargs):
         """Different from `to_search_value`, this converts the value to an
         appropriate value for filtering it by. This is proabably only useful
@@ -116,6 +232,23 @@ class Field(object):
         """
         return value
 
+    def to_facet_value(self, value):
+        """Convert a search API value of this field to the value it's put as
+        a facet with, or `None` if the document shouldn't have the facet
+        (i.e. the value is missing).
+        """
+        if value is None or value == self.none_value():
+            return None
+        return value
+
+    def from_facet_value(self, label):
+        """Convert a facet value's label from a query's facet results to its
+        python equivalent.
+        """
+        if self.search_api_facet is search_api.NumberFacet:
+            return self.from_search_value(float(label))
+        return self.from_search_value(label)
+
 
 class TextField(Field):
     """A field for a string of text. Accepts an optional `indexer` parameter
@@ -123,11 +256,16 @@ class TextField(Field):
     to the search API.
     """
     search_api_field = search_api.TextField
+    search_api_facet = search_api.AtomFacet
 
     def __init__(self, indexer=None, **kwargs):
         self.indexer = indexer
         super(TextField, self).__init__(**kwargs)
 
+        # Only the indexed tokens are kept, not the original text
+        if self.facet and indexer is not None:
+            raise FieldError('Indexed text fields cannot be facets')
+
     def none_value(self):
         return u'___NONE___'
 
@@ -183,6 +321,7 @@ class AtomField(TextField):
 class FloatField(Field):
     """A field representing a floating point value"""
     search_api_field = search_api.NumberField
+    search_api_facet = search_api.NumberFacet
 
     def __init__(self, minimum=None, maximum=None, **kwargs):
         """If minimum and maximum are given, any value assigned to this field
@@ -216,13 +355,25 @@ class FloatField(Field):
             return None
         return float(value)
 
+    def to_search_values(self, values):
+        return numbers_to_search_values(self, values, float, numpy and numpy.float64)
+
+    def to_pythons(self, values):
+        return numbers_to_pythons(self, values, float, numpy and numpy.float64)
+
+    def from_search_values(self, values):
+        return self.to_pythons(values)
+
     def prep_value_for_filter(self, value, **kwargs):
-        return str(self.to_search_value(value))
+        # `str()` rounds floats to 12 significant digits, so equality filters
+        # wouldn't match the value that was put
+        return repr(self.to_search_value(value))
 
 
 class IntegerField(Field):
     """A field representing an integer value"""
     search_api_field = search_api.NumberField
+    search_api_facet = search_api.NumberFacet
 
     def __init__(self, minimum=None, maximum=None, **kwargs):
         """If minimum and maximum are given, any value assigned to this field
@@ -256,6 +407,15 @@ class IntegerField(Field):
             return None
         return int(value)
 
+    def to_search_values(self, values):
+        return numbers_to_search_values(self, values, int, numpy and numpy.int64)
+
+    def to_pythons(self, values):
+        return numbers_to_pythons(self, values, int, numpy and numpy.int64)
+
+    def from_search_values(self, values):
+        return self.to_pythons(values)
+
     def prep_value_for_filter(self, value, **kwargs):
         return str(self.to_search_value(value))
 
@@ -263,6 +423,7 @@ class IntegerField(Field):
 class BooleanField(Field):
     """A field representing a True/False value"""
     search_api_field = search_api.NumberField
+    search_api_facet = search_api.NumberFacet
 
     def none_value(self):
         return MIN_SEARCH_API_INT
@@ -292,6 +453,17 @@ class BooleanField(Field):
     def prep_value_from_search(self, value):
         return bool(int(value))
 
+    def from_search_value(self, value):
+        return self.to_python(value)
+
+    def to_pythons(self, values):
+        return numbers_to_pythons(
+            self, values, lambda value: bool(int(value)), numpy and numpy.bool_
+        )
+
+    def from_search_values(self, values):
+        return self.to_pythons(values)
+
 
 class DateField(Field):
     """A field representing a date(time) object
@@ -372,15 +544,19 @@ class DateTimeField(Field):
     It will raise a TypeError if used with offset-aware datetime instances.
     """
     search_api_field = search_api.NumberField
+    search_api_facet = search_api.NumberFacet
 
     def none_value(self):
         return MIN_SEARCH_API_INT
 
-    def to_search_value(self, value):
+    def to_naive_datetime(self, value):
+        """Does everything `to_search_value` does except for converting to a
+        timestamp. Returns None for the none value.
+        """
         value = super(DateTimeField, self).to_search_value(value)
 
         if value is None or value == self.none_value():
-            return self.none_value()
+            return None
 
         if timezone.is_tz_aware(value):
             if value == self.default:
@@ -390,32 +566,87 @@ class DateTimeField(Field):
             else:
                 raise TypeError('Datetime values must be offset-naive')
 
-        timestamp = timezone.datetime_to_timestamp(value)
+        return value
 
+    def check_timestamp(self, timestamp):
         # You aren't allowed to have the min value, we reserve that for None.
         if not (MIN_SEARCH_API_INT < timestamp <= MAX_SEARCH_API_INT):
             raise ValueError('Datetime out of range')
-
         return timestamp
 
+    def to_search_value(self, value):
+        value = self.to_naive_datetime(value)
+
+        if value is None:
+            return self.none_value()
+
+        return self.check_timestamp(timezone.datetime_to_timestamp(value))
+
+    def to_search_values(self, values):
+        none_value = self.none_value()
+        values = [self.to_naive_datetime(value) for value in values]
+
+        if not use_numpy(values):
+            return [
+                none_value if value is None
+                else self.check_timestamp(timezone.datetime_to_timestamp(value))
+                for value in values
+            ]
+
+        present = [value for value in values if value is not None]
+        # Going via microseconds floors the timestamps, the same as `timegm`
+        # ignoring microseconds does
+        timestamps = (
+            numpy.array(present, dtype='datetime64[us]').astype(numpy.int64)
+            // 1000000
+        )
+        if len(timestamps) and not (
+                (timestamps > MIN_SEARCH_API_INT) & (timestamps <= MAX_SEARCH_API_INT)).all():
+            raise ValueError('Datetime out of range')
+
+        timestamps = iter(timestamps.tolist())
+        return [none_value if value is None else next(timestamps) for value in values]
+
     def to_python(self, value):
         if value == self.none_value():
             return None
         else:
             return timezone.timestamp_to_datetime(value)
 
+    def to_pythons(self, values):
+        none_value = self.none_value()
+
+        if not use_numpy(values):
+            return [
+                None if value == none_value
+                else timezone.timestamp_to_datetime(value)
+                for value in values
+            ]
+
+        array = numpy.asarray(values, dtype=numpy.float64)
+        converted = array.astype(numpy.int64).astype('datetime64[s]').tolist()
+        for i in numpy.flatnonzero(array == none_value):
+            converted[i] = None
+        return converted
+
     def prep_value_for_filter(self, value, filter_expr=None):
         return self.to_search_value(value)
 
     def prep_value_from_search(self, value):
         return self.to_python(value)
 
+    def from_search_value(self, value):
+        return self.to_python(value)
+
+    def from_search_values(self, values):
+        return self.to_pythons(values)
+
 
 class TZDateTimeField(DateTimeField):
     """Like DateTimeField, but raises a TypeError if used with offset-naive
     datetime instances.
     """
-    def to_search_value(self, value):
+    def to_utc(self, value):
         if isinstance(value, datetime):
             try:
                 value = value.astimezone(timezone.utc)
@@ -423,8 +654,15 @@ class TZDateTimeField(DateTimeField):
                 raise TypeError('Datetime values must be offset-aware')
 
             value = value.replace(tzinfo=None)
+        return value
+
+    def to_search_value(self, value):
+        return super(TZDateTimeField, self).to_search_value(self.to_utc(value))
 
-        return super(TZDateTimeField, self).to_search_value(value)
+    def to_search_values(self, values):
+        return super(TZDateTimeField, self).to_search_values(
+            [self.to_utc(value) for value in values]
+        )
 
     def to_python(self, value):
         value = super(TZDateTimeField, self).to_python(value)
@@ -432,6 +670,12 @@ class TZDateTimeField(DateTimeField):
         if value:
             return value.replace(tzinfo=timezone.utc)
 
+    def to_pythons(self, values):
+        return [
+            value and value.replace(tzinfo=timezone.utc)
+            for value in super(TZDateTimeField, self).to_pythons(values)
+        ]
+
 
 class GeoField(Field):
     """ A field representing a GeoPoint """
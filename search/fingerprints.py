@@ -0,0 +1,85 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from google.appengine.api import search as search_api
+
+
+def get_fingerprint(search_document, rank=None):
+    """Get a hash of `rank` and the field values of `search_document`, a
+    Search API `Document`, that stays the same for as long as the indexed
+    content of the document does.
+
+    `rank` is the rank given to the document (i.e. `DocumentModel._rank`)
+    rather than the Search API document's, since the Search API fills in a
+    rank that changes every second for documents without one.
+    """
+    parts = [repr(rank)]
+
+    for f in sorted(search_document.fields, key=lambda f: f.name):
+        value = f.value
+        if isinstance(value, search_api.GeoPoint):
+            value = (value.latitude, value.longitude)
+        parts.append(repr((f.name, type(f).__name__, value)))
+
+    return hashlib.sha1("\n".join(parts)).hexdigest()
+
+
+def get_fingerprint_key(index_name, doc_id):
+    return "{}:{}".format(index_name, doc_id)
+
+
+class FingerprintedPutFuture(object):
+    """Wraps the future for a put of changed documents, so that their new
+    fingerprints are only stored once the put has succeeded.
+    """
+    def __init__(self, future, store, fingerprints):
+        self._future = future
+        self._store = store
+        self._fingerprints = fingerprints
+
+    def get_result(self):
+        # Nothing was put if every document was unchanged
+        results = self._future.get_result() if self._future else []
+
+        if self._fingerprints:
+            self._store.set_many(self._fingerprints)
+            self._fingerprints = None
+        return results
+
+
+class LRUFingerprintStore(object):
+    """Keeps the fingerprints of the last `max_size` documents put in memory.
+
+    All stores implement `get_many`, `set_many` and `delete_many`, taking
+    lists of keys or a dict of keys to fingerprints, like Django's cache API.
+    """
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._fingerprints = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                fingerprint = self._fingerprints.pop(key, None)
+                if fingerprint is not None:
+                    # Move it back to the most recently used end
+                    self._fingerprints[key] = fingerprint
+                    found[key] = fingerprint
+        return found
+
+    def set_many(self, mapping):
+        with self._lock:
+            for key, fingerprint in mapping.items():
+                self._fingerprints.pop(key, None)
+                self._fingerprints[key] = fingerprint
+
+            while len(self._fingerprints) > self.max_size:
+                self._fingerprints.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._fingerprints.pop(key, None)
@@ -1,8 +1,16 @@
+from collections import OrderedDict, deque
+
 from google.appengine.api import search as search_api
 
-from .errors import DocumentClassRequiredError
-from .fields import Field
-from .query import SearchQuery, construct_document
+from .buffer import MAX_BATCH_SIZE, get_write_buffer
+from .errors import DocumentClassRequiredError, FieldNotLoadedError
+from .fields import NOT_SET, Field
+from .fingerprints import FingerprintedPutFuture, get_fingerprint, get_fingerprint_key
+from .query import (
+    SearchQuery, construct_document, construct_documents, invalidate_memos
+)
+from .singleflight import get_search_scope
+from .utils import get_index_key, iter_batches, wait_all
 
 
 class Options(object):
@@ -11,6 +19,264 @@ class Options(object):
     """
     def __init__(self, fields):
         self.fields = fields
+        # Set by `MetaClass` once the document class exists
+        self.result_class = None
+
+
+class SlotField(object):
+    """Descriptor for a field on a document class's result class (see
+    `build_result_class`). Unlike `Field`, it keeps the field's python value
+    in a slot, so reading it needs no conversion at all. Setting it still
+    validates and converts the value like `Field.__set__` does.
+
+    If the result was constructed lazily, the slot starts off empty and the
+    value is decoded from the raw Search API value the first time it's read.
+    If the field wasn't returned by the query at all, reading it raises
+    `FieldNotLoadedError`.
+    """
+    __slots__ = ('field', 'slot')
+
+    def __init__(self, field, slot):
+        self.field = field
+        self.slot = slot
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self.field
+        try:
+            return self.slot.__get__(instance, owner)
+        except AttributeError:
+            return self.load(instance)
+
+    def __set__(self, instance, value):
+        field = self.field
+        self.slot.__set__(instance, field.to_python(field.to_search_value(value)))
+
+    def load(self, instance):
+        """Decode this field's value from the raw values the result was
+        constructed with, and keep it in the slot.
+        """
+        loaded = instance._loaded
+        if loaded is not None and self.field.name not in loaded:
+            raise FieldNotLoadedError(
+                "{}.{} wasn't returned by the query this document came from "
+                "(see SearchQuery.only and SearchQuery.defer)"
+                .format(instance._document_class.__name__, self.field.name)
+            )
+
+        raw = instance._raw
+        if raw is None:
+            raise AttributeError(self.field.name)
+
+        self.decode(instance, raw)
+        return self.slot.__get__(instance)
+
+    def decode(self, instance, raw):
+        """Store this field's value on `instance` from `raw`, a dict of the
+        Search API values of a search result.
+        """
+        value = raw.get(self.field.name)
+        if value is None:
+            # Missing values get the default or none value for the field
+            self.__set__(instance, None)
+        else:
+            self.slot.__set__(instance, self.field.from_search_value(value))
+
+    def decode_many(self, instances, raws):
+        """Bulk version of `decode`, decoding this field's values for all of
+        `instances` with the field's `from_search_values`.
+        """
+        name = self.field.name
+        found, values = [], []
+
+        for instance, raw in zip(instances, raws):
+            value = raw.get(name)
+            if value is None:
+                self.__set__(instance, None)
+            else:
+                found.append(instance)
+                values.append(value)
+
+        for instance, value in zip(found, self.field.from_search_values(values)):
+            self.slot.__set__(instance, value)
+
+
+class ResultDocument(object):
+    """Mixin for the compact classes that search results are constructed as"""
+    __slots__ = ()
+
+    def get_snippets(self):
+        return self._snippets
+
+    def __reduce__(self):
+        # The result class isn't importable, so pickle results as their
+        # document class and the values in their slots
+        cls = type(self)
+        state = {}
+        for name in cls.__slots__:
+            try:
+                state[name] = cls.__dict__[name].__get__(self, cls)
+            except AttributeError:
+                pass
+        return (unpickle_result, (cls._document_class, state))
+
+
+def unpickle_result(document_class, state):
+    """Rebuild a search result pickled by `ResultDocument.__reduce__`"""
+    result_class = document_class._meta.result_class
+    doc = result_class.__new__(result_class)
+    for name, value in state.items():
+        result_class.__dict__[name].__set__(doc, value)
+    return doc
+
+
+def assemble_search_documents(docs, columns, facet_columns=()):
+    """Build a Search API document for each of `docs` from `columns`, a list
+    with a list of Search API fields (one per document) for each field, and
+    `facet_columns`, the same for the Search API facets of any fields with
+    `facet=True`, with `None` for documents without the facet.
+    """
+    Document = search_api.Document
+    rows = zip(*columns) if columns else [()] * len(docs)
+    if not facet_columns:
+        return [
+            Document(doc_id=doc.doc_id, rank=doc._rank, fields=list(fields))
+            for doc, fields in zip(docs, rows)
+        ]
+
+    return [
+        Document(
+            doc_id=doc.doc_id,
+            rank=doc._rank,
+            fields=list(fields),
+            facets=[facet for facet in facets if facet is not None]
+        )
+        for doc, fields, facets in zip(docs, rows, zip(*facet_columns))
+    ]
+
+
+def build_facet_column(field, values):
+    """Build the Search API facets for a column of search API `values` of
+    `field`, a field with `facet=True`.
+    """
+    api_facet = field.search_api_facet
+    facet_values = [field.to_facet_value(v) for v in values]
+    return [
+        None if v is None else api_facet(name=field.name, value=v)
+        for v in facet_values
+    ]
+
+
+def build_serializer(document_class):
+    """Build the function that converts a list of instances of
+    `document_class` to Search API documents, for use as its
+    `_to_search_documents` static method.
+
+    The fields are looked up and their Search API field classes and
+    converters are bound once, here, rather than for every document put.
+    Field values are already kept as search API values (see `Field.__set__`),
+    so they're read straight from each instance `__dict__`, and only converted
+    if the field hasn't been set. That means the fields' bulk codecs aren't
+    needed here, only by `build_result_serializer`.
+    """
+    plan = tuple(
+        (name, field.search_api_field, field)
+        for name, field in sorted(document_class._meta.fields.items())
+    )
+
+    def to_search_documents(docs):
+        columns = []
+        facet_columns = []
+        for name, api_field, field in plan:
+            column = [doc.__dict__.get(name, NOT_SET) for doc in docs]
+            if any(v is NOT_SET for v in column):
+                none_value = field.to_search_value(None)
+                column = [none_value if v is NOT_SET else v for v in column]
+            columns.append([api_field(name=name, value=v) for v in column])
+            if field.facet:
+                facet_columns.append(build_facet_column(field, column))
+        return assemble_search_documents(docs, columns, facet_columns)
+
+    return to_search_documents
+
+
+def build_result_serializer(result_class):
+    """Like `build_serializer`, but for a result class built by
+    `build_result_class`, whose field values are kept in slots as python
+    values. Each field's values are converted together with the field's bulk
+    `to_search_values`.
+    """
+    plan = tuple(
+        (name, field.search_api_field, field, result_class.__dict__[name])
+        for name, field in sorted(result_class._meta.fields.items())
+    )
+
+    def to_search_documents(docs):
+        columns = []
+        facet_columns = []
+        for name, api_field, field, slot_field in plan:
+            column = field.to_search_values(
+                [slot_field.__get__(doc, None) for doc in docs]
+            )
+            columns.append([api_field(name=name, value=v) for v in column])
+            if field.facet:
+                facet_columns.append(build_facet_column(field, column))
+        return assemble_search_documents(docs, columns, facet_columns)
+
+    return to_search_documents
+
+
+def get_slot_name(field_name):
+    return '_f_%s' % field_name
+
+
+def build_result_class(document_class):
+    """Build the class that search results for `document_class` are
+    constructed as.
+
+    It's a subclass of `document_class` with `__slots__` for the doc ID, rank,
+    snippets and every field value, so nothing is ever stored in a result's
+    instance `__dict__`, which is then never allocated, and each result's
+    snippets are kept in a slot rather than in a closure. Lazily constructed
+    results also keep the raw field values from the Search API, which each
+    field is decoded from the first time it's read, and results of queries
+    that only return some fields keep the names of the fields they have.
+
+    It has the same name as `document_class`, but can't be imported by it,
+    so results are pickled as their document class (see
+    `ResultDocument.__reduce__`).
+    """
+    fields = document_class._meta.fields
+    slots = (
+        'doc_id', '_rank', '_snippets', '_snippets_or_values', '_raw', '_loaded'
+    ) + tuple(
+        get_slot_name(name) for name in fields
+    )
+
+    # Using `type.__new__` skips `MetaClass.__new__`, so the result class
+    # shares its document class's `_meta`
+    result_class = type.__new__(
+        type(document_class),
+        document_class.__name__,
+        (ResultDocument, document_class),
+        {
+            '__slots__': slots,
+            '__module__': document_class.__module__,
+            '_document_class': document_class,
+        }
+    )
+
+    for name, field in fields.items():
+        slot = result_class.__dict__[get_slot_name(name)]
+        setattr(result_class, name, SlotField(field, slot))
+
+    result_class._slot_fields = tuple(
+        result_class.__dict__[name] for name in fields
+    )
+    result_class._to_search_documents = staticmethod(
+        build_result_serializer(result_class)
+    )
+    return result_class
 
 
 class MetaClass(type):
@@ -24,9 +290,7 @@ class MetaClass(type):
     >>> t.prop
     'Hello'
     >>> Thing.prop
-    Traceback ...:
-        ...
-    AttributeError: type object 'Thing' has no attribute 'prop'
+    <search.Field object at 0xXXXXXXXX>
     >>> Thing._meta.fields['prop']
     <search.Field object at 0xXXXXXXXX>
     """
@@ -57,9 +321,10 @@ class MetaClass(type):
             if isinstance(field, Field):
                 field.add_to_class(new_cls, name)
                 fields[name] = field
-                delattr(new_cls, name)
 
         new_cls._meta = Options(fields)
+        new_cls._to_search_documents = staticmethod(build_serializer(new_cls))
+        new_cls._meta.result_class = build_result_class(new_cls)
         return new_cls
 
 
@@ -68,6 +333,10 @@ class DocumentModel(object):
 
     __metaclass__ = MetaClass
 
+    # The names of the fields this document has values for, if it was
+    # constructed from a search that only returned some of its fields
+    _loaded = None
+
     def __init__(self, **kwargs):
         # No fancy Django `*args` mangling here, just use `**kwargs`
         for name, field in self._meta.fields.items():
@@ -79,27 +348,9 @@ class DocumentModel(object):
         # define a nicer API for setting the value
         self._rank = kwargs.get("_rank")
 
-    def __getattribute__(self, name):
-        """Make sure that any attribute accessed on document classes returns the
-        python representation of its value.
-        """
-        # TODO: Probably use `Field`s as descriptors and leave this to them
-        val = object.__getattribute__(self, name)
-        meta = object.__getattribute__(self, '_meta')
-        if name in meta.fields:
-            f = meta.fields[name]
-            val = f.to_python(val)
-        return val
-
-    def __setattr__(self, name, val):
-        """Make sure that any attibutes set on document class instances get the
-        value converted to the search API accepted value.
-        """
-        # TODO: Probably use `Field`s as descriptors and leave this to them
-        if name in self._meta.fields:
-            f = self._meta.fields[name]
-            val = f.to_search_value(val)
-        super(DocumentModel, self).__setattr__(name, val)
+    def _to_search_document(self):
+        """Convert this document to a Search API document"""
+        return self._to_search_documents([self])[0]
 
     def get_snippets(self):
         """Get the snippets for this document as a dictionary of the form:
@@ -119,9 +370,10 @@ class DocumentModel(object):
         """
         if not hasattr(self, "_snippets_or_values"):
             snippets = self.get_snippets()
+            fields = self._meta.fields if self._loaded is None else self._loaded
             self._snippets_or_values = {
                 field: snippets.get(field) or getattr(self, field, None)
-                for field in self._meta.fields
+                for field in fields
             }
         return self._snippets_or_values
 
@@ -130,7 +382,8 @@ class Index(object):
     """A search index. Provides methods for adding, removing and searching
     documents in this index.
     """
-    def __init__(self, name=None, document_class=None):
+    def __init__(self, name=None, document_class=None, fingerprint_store=None,
+            result_cache=None, namespace=None):
         # Mandatory keyword argument... right. Mainly for compatibility with
         # the Search API's `Index` class
         if not name:
@@ -141,9 +394,17 @@ class Index(object):
 
         self.name = name
         self.document_class = document_class
-
-        # The actual index object from the Search API
-        self._index = search_api.Index(name=name)
+        # If set, documents are only put if their fingerprint has changed
+        # since they were last put. See `fingerprints.LRUFingerprintStore`.
+        self.fingerprint_store = fingerprint_store
+        # If set, searches on this index are cached in it, and invalidated
+        # whenever documents are put or deleted. See `cache.ResultCache`.
+        self.result_cache = result_cache
+
+        # The actual index object from the Search API, in the current
+        # namespace if `namespace` isn't given
+        self._index = search_api.Index(name=name, namespace=namespace)
+        self.namespace = self._index.namespace
 
     def list_documents(self, **kwargs):
         """Deprecated. Use `get_range` instead"""
@@ -178,7 +439,7 @@ class Index(object):
             # behaviour
             return [doc.doc_id for doc in docs]
         if document_class:
-            return [construct_document(document_class, doc) for doc in docs]
+            return construct_documents(document_class, docs)
         return docs
 
     def get(self, doc_id, document_class=None):
@@ -193,43 +454,209 @@ class Index(object):
         return doc
 
     def put(self, documents):
-        """Add `documents` to this index"""
+        """Add `documents` to this index.
+
+        If this index has a `fingerprint_store`, any documents that haven't
+        changed since they were last put are skipped, and no `PutResult` is
+        returned for them.
+
+        If a `buffer.WriteBuffer` is open on this thread, the documents are
+        queued on it and sent later in a batch, and `None` is returned.
+        """
+        # If documents is actually just a single document, stick it in a list
+        try:
+            len(documents)
+        except TypeError:
+            documents = [documents]
 
-        def get_fields(doc):
-            """Convenience function for getting the search API fields list
-            from the given document `d`.
-            """
-            api_fields = []
+        write_buffer = get_write_buffer()
+        if write_buffer is not None:
+            write_buffer.put(self, documents)
+            return None
 
-            for name, field in doc._meta.fields.items():
-                value = field.to_search_value(getattr(doc, name, None))
-                api_field = field.search_api_field(name=name, value=value)
-                api_fields.append(api_field)
+        return self._put(documents)
 
-            return api_fields
+    def _put(self, documents):
+        """Send `documents` to the Search API straight away, in as many
+        batches as the Search API needs.
+        """
+        futures = [
+            self.put_async(batch)
+            for batch in iter_batches(documents, MAX_BATCH_SIZE)
+        ]
+        try:
+            return [result for results in wait_all(futures) for result in results]
+        finally:
+            self.invalidate_results()
 
+    def _to_search_documents(self, documents):
+        """Construct the actual search API documents to add to the underlying
+        search API index from the given `documents`.
+        """
+        # Convert each document class's documents together, keeping the
+        # original order
+        by_class = OrderedDict()
+        for i, doc in enumerate(documents):
+            by_class.setdefault(type(doc), []).append(i)
+
+        if len(by_class) == 1:
+            return type(documents[0])._to_search_documents(documents)
+
+        search_docs = [None] * len(documents)
+        for document_class, positions in by_class.items():
+            converted = document_class._to_search_documents(
+                [documents[i] for i in positions]
+            )
+            for i, search_doc in zip(positions, converted):
+                search_docs[i] = search_doc
+        return search_docs
 
-        # If documents is actually just a single document, stick it in a list
+    def put_async(self, documents):
+        """Like `put`, but returns a future straight away instead of blocking
+        on the RPC. Call `get_result()` on the future (or pass it to
+        `wait_all`) to get the list of `PutResult`s.
+
+        Async puts are never held by a `buffer.WriteBuffer`, and don't
+        invalidate the `result_cache` (see `invalidate_results`).
+        """
         try:
             len(documents)
         except TypeError:
             documents = [documents]
 
-        # Construct the actual search API documents to add to the underlying
-        # search API index
+        search_docs = self._to_search_documents(documents)
+        if self.fingerprint_store is None:
+            return self._index.put_async(search_docs)
+        return self._put_changed_async(documents, search_docs)
+
+    def _put_changed_async(self, documents, search_docs):
+        """Put only the Search API documents in `search_docs`, built from
+        `documents`, whose fingerprint differs from the one last put for that
+        doc ID.
+        """
+        fingerprints = {
+            get_fingerprint_key(self.name, search_doc.doc_id):
+                get_fingerprint(search_doc, doc._rank)
+            for doc, search_doc in zip(documents, search_docs)
+            if search_doc.doc_id
+        }
+        stored = self.fingerprint_store.get_many(fingerprints.keys())
+
+        for key, fingerprint in stored.items():
+            if fingerprints.get(key) == fingerprint:
+                del fingerprints[key]
+
         search_docs = [
-            search_api.Document(
-                doc_id=d.doc_id,
-                rank=d._rank,
-                fields=get_fields(d)
-            )
-            for d in documents
+            doc for doc in search_docs
+            if not doc.doc_id or get_fingerprint_key(self.name, doc.doc_id) in fingerprints
         ]
-        return self._index.put(search_docs)
+        future = self._index.put_async(search_docs) if search_docs else None
+        return FingerprintedPutFuture(future, self.fingerprint_store, fingerprints)
+
+    def put_stream(self, documents, batch_size=MAX_BATCH_SIZE, max_in_flight=4):
+        """Put all the documents from the iterable `documents` into this
+        index, e.g. from a generator over a whole datastore table.
+
+        Documents are read from `documents` `batch_size` at a time, and each
+        batch is sent in its own async put. Once `max_in_flight` puts are
+        waiting on the Search API, no more documents are read until the oldest
+        put has finished, so only a few batches are ever held in memory. If a
+        doc ID appears more than once in a batch, only the last of those
+        documents is put. If a put fails, the puts still in flight are waited
+        on before its error is raised.
+
+        Returns the number of documents that were put.
+        """
+        batch_size = min(batch_size, MAX_BATCH_SIZE)
+        in_flight = deque()
+        count = 0
+
+        try:
+            for batch in iter_batches(documents, batch_size):
+                batch = self._dedupe(batch)
+                if len(in_flight) >= max_in_flight:
+                    # Only drop the future once it's succeeded, so a failed
+                    # put's error is raised from `wait_all` below, after the
+                    # rest of the puts have finished
+                    in_flight[0].get_result()
+                    in_flight.popleft()
+
+                in_flight.append(self.put_async(batch))
+                count += len(batch)
+        finally:
+            try:
+                wait_all(in_flight)
+            finally:
+                self.invalidate_results()
+        return count
+
+    def _dedupe(self, documents):
+        """Remove all but the last document for each doc ID in `documents`"""
+        deduped = OrderedDict()
+        for doc in documents:
+            # Documents without an ID will all get different IDs from the
+            # Search API
+            key = doc.doc_id or object()
+            deduped.pop(key, None)
+            deduped[key] = doc
+        return deduped.values()
 
     def delete(self, doc_ids):
-        """Delete documents with the given `doc_ids` from this index"""
-        return self._index.delete(doc_ids)
+        """Delete documents with the given `doc_ids` from this index.
+
+        If a `buffer.WriteBuffer` is open on this thread, the deletes are
+        queued on it and sent later in a batch, and `None` is returned.
+        """
+        if isinstance(doc_ids, basestring):
+            doc_ids = [doc_ids]
+
+        write_buffer = get_write_buffer()
+        if write_buffer is not None:
+            write_buffer.delete(self, doc_ids)
+            return None
+
+        return self._delete(doc_ids)
+
+    def _delete(self, doc_ids):
+        """Delete documents with the given `doc_ids` straight away"""
+        self._forget_fingerprints(doc_ids)
+        try:
+            return self._index.delete(doc_ids)
+        finally:
+            self.invalidate_results()
+
+    def delete_async(self, doc_ids):
+        """Like `delete`, but returns a future straight away instead of
+        blocking on the RPC.
+
+        Async deletes are never held by a `buffer.WriteBuffer`, and don't
+        invalidate the `result_cache` (see `invalidate_results`).
+        """
+        if isinstance(doc_ids, basestring):
+            doc_ids = [doc_ids]
+
+        self._forget_fingerprints(doc_ids)
+        return self._index.delete_async(doc_ids)
+
+    def invalidate_results(self):
+        """Stop any search results cached in this index's `result_cache`,
+        prefetched for the next page of a query, or kept by the open
+        `SearchScope`, and any counts or facet results memoised by queries
+        (see `query.QueryMemo`), being used. Called after every put and
+        delete, apart from async ones.
+        """
+        invalidate_memos(get_index_key(self))
+        scope = get_search_scope()
+        if scope is not None:
+            scope.invalidate(get_index_key(self))
+        if self.result_cache is not None:
+            self.result_cache.invalidate(get_index_key(self))
+
+    def _forget_fingerprints(self, doc_ids):
+        if self.fingerprint_store is not None:
+            self.fingerprint_store.delete_many([
+                get_fingerprint_key(self.name, doc_id) for doc_id in doc_ids
+            ])
 
     def purge(self):
         """Deletes all documents from this index.
@@ -240,7 +667,9 @@ class Index(object):
         """
         doc_ids = self.get_range(ids_only=True)
         while doc_ids:
-            self.delete(doc_ids)
+            # Skip any write buffer, otherwise the same IDs would come back
+            # from `get_range` forever
+            self._delete(doc_ids)
             doc_ids = self.get_range(
                 ids_only=True,
                 start_id=doc_ids[-1],
@@ -257,8 +686,51 @@ class Index(object):
                 "pass one to the search method."
             )
 
-        return SearchQuery(
+        query = SearchQuery(
             self._index,
             document_class=document_class,
             ids_only=ids_only
         )
+        if self.result_cache is not None:
+            query = query.cache(self.result_cache)
+        return query
+
+    @staticmethod
+    def multi_search(queries):
+        """Run all the `SearchQuery`s in `queries` at once, with async
+        searches, so that they take about as long as the slowest of them
+        rather than all of them added up. The queries can be on any index.
+
+        Returns a list of each query's results, in the same order as
+        `queries`. If a query's search fails, the Search API's error is
+        returned in place of its results, so one failed search doesn't lose
+        the others' results:
+
+        >>> films, people = Index.multi_search([film_query, person_query])
+        >>> if isinstance(people, search_api.Error):
+        ...     people = []
+
+        Any other error (e.g. from a query with unbound parameters) is raised
+        straight away.
+
+        Each query keeps its results too, just as if it had been iterated
+        over, and like iterating over a query again, a query that already has
+        results isn't searched again: its existing results are returned.
+        """
+        futures = []
+        for query in queries:
+            try:
+                futures.append(query.fetch_async())
+            except search_api.Error as e:
+                futures.append(e)
+
+        results = []
+        for future in futures:
+            if isinstance(future, search_api.Error):
+                results.append(future)
+                continue
+            try:
+                results.append(future.get_result())
+            except search_api.Error as e:
+                results.append(e)
+        return results
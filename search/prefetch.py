@@ -0,0 +1,68 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class PrefetchRegistry(object):
+    """Keeps the futures of searches started ahead of time for the next page
+    of a query (see `SearchQuery.prefetch`), until a query for that page is
+    run and takes its future instead of starting its own search.
+
+    Each `singleflight.SearchScope` has its own registry, which is cleared
+    when the scope is closed, since App Engine RPCs belong to the request
+    that started them and can't be waited on by any other.
+
+    Only the `max_size` most recently started searches are kept, and only
+    for `timeout` seconds, since the page they're for may never be asked for,
+    and the results would be out of date by then anyway. Searches on an index
+    are forgotten as soon as documents are put in or deleted from it through
+    an `indexes.Index` on the scope's thread (see `invalidate`).
+    """
+    def __init__(self, max_size=100, timeout=10):
+        self.max_size = max_size
+        self.timeout = timeout
+
+        # (index key, query key) -> (expiry time, future)
+        self._futures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._futures)
+
+    def __contains__(self, key):
+        return key in self._futures
+
+    def add(self, index_key, key, future):
+        """Keep `future`, the future for the search with `key` (see
+        `SearchQuery.get_cache_key`) on the index with `index_key` (see
+        `utils.get_index_key`).
+        """
+        with self._lock:
+            self._futures.pop((index_key, key), None)
+            self._futures[(index_key, key)] = (time.time() + self.timeout, future)
+
+            while len(self._futures) > self.max_size:
+                self._futures.popitem(last=False)
+
+    def pop(self, index_key, key):
+        """Take the future for the search with `key` on the index with
+        `index_key`, or get `None` if there isn't one.
+        """
+        with self._lock:
+            expires, future = self._futures.pop((index_key, key), (None, None))
+
+        if future is None or expires <= time.time():
+            return None
+        return future
+
+    def invalidate(self, index_key):
+        """Forget the searches started on the index with `index_key`"""
+        with self._lock:
+            for cache_key in self._futures.keys():
+                if cache_key[0] == index_key:
+                    del self._futures[cache_key]
+
+    def clear(self):
+        with self._lock:
+            self._futures.clear()
+
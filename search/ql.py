@@ -11,6 +11,25 @@ class GeoQueryArguments(object):
         self.lat, self.lon, self.radius = lat, lon, radius
 
 
+class Param(object):
+    """A placeholder for a filter value that's only given when the query is
+    run. See `SearchQuery.prepare`.
+
+    >>> Q(title__contains=Param('title'))
+    """
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return 'Param(%r)' % self.name
+
+    def get_marker(self, filter_lookup):
+        """Get the string that stands in for this parameter in a query
+        template, see `QueryTemplate`.
+        """
+        return u'\x00%s\x01%s\x00' % (self.name, filter_lookup)
+
+
 class FilterExpr(object):
     # Default separator between field name and lookup type in the left hand
     # side of the filter expression
@@ -52,19 +71,23 @@ class FilterExpr(object):
         return self.__unicode__()
 
     def __unicode__(self):
+        return self.format(self.value)
+
+    def format(self, value):
+        """Format this filter expression with `value` as its value"""
         template = self.OPS[self.op]
 
         if self.op.startswith('geo'):
-            if not isinstance(self.value, GeoQueryArguments):
-                raise TypeError(self.value)
+            if not isinstance(value, GeoQueryArguments):
+                raise TypeError(value)
             return template % (
                 self.prop_name,
-                self.value.lat,
-                self.value.lon,
-                self.value.radius
+                value.lat,
+                value.lon,
+                value.radius
             )
 
-        return template % (self.prop_name, self.value)
+        return template % (self.prop_name, value)
 
     def __debug(self):
         """Enable debugging features"""
@@ -99,17 +122,24 @@ class FilterExpr(object):
 
 
 class Q(object):
+    """A node in a tree of filters, joined by `conn` and negated if
+    `inverted`. Each child is another `Q` or a `(field_lookup, value)` tuple.
+
+    Nodes are immutable: combining them (with `&`, `|` and `~`) makes new
+    nodes that share the existing ones as children, rather than copying or
+    changing them. This means any node can be shared between queries, and
+    the query string compiled for a node never goes stale.
+    """
     AND = u'AND'
     OR = u'OR'
     NOT = u'NOT'
     DEFAULT = AND
 
-    def __init__(self, **kwargs):
-        self.kwargs = kwargs
-        children = kwargs.items()
+    FROZEN_ATTRS = ('children', 'conn', 'inverted')
 
-        self.children = []
-        for k, v in children:
+    def __init__(self, **kwargs):
+        children = []
+        for k, v in kwargs.items():
             try:
                 v_is_list = bool(iter(v)) and not issubclass(type(v), basestring)
             except TypeError:
@@ -119,12 +149,35 @@ class Q(object):
                 q = Q(**{k:v[0]})
                 for value in v[1:]:
                     q |= Q(**{k:value})
-                self.children.append(q)
+                children.append(q)
             else:
-                self.children.append((k, v))
+                children.append((k, v))
+
+        self.kwargs = kwargs
+        self._init(tuple(children), self.DEFAULT, False)
+
+    def _init(self, children, conn, inverted):
+        d = self.__dict__
+        d['children'] = children
+        d['conn'] = conn
+        d['inverted'] = inverted
+        # Document class -> query string compiled for it by `Query`
+        d['_compiled'] = {}
+
+    @classmethod
+    def create(cls, children=(), conn=DEFAULT, inverted=False):
+        """Make a node with the given children directly"""
+        obj = cls.__new__(cls)
+        obj.kwargs = {}
+        obj._init(tuple(children), conn, inverted)
+        return obj
 
-        self.conn = self.DEFAULT
-        self.inverted = False
+    def __setattr__(self, name, value):
+        if name in self.FROZEN_ATTRS:
+            raise AttributeError(
+                "Q objects are immutable, use Q.create to make a new one"
+            )
+        super(Q, self).__setattr__(name, value)
 
     def __and__(self, other):
         return self._combine(other, self.AND)
@@ -133,9 +186,7 @@ class Q(object):
         return self._combine(other, self.OR)
 
     def __invert__(self):
-        obj = type(self)(**self.kwargs)
-        obj.inverted = not self.inverted
-        return obj
+        return type(self).create(self.children, self.conn, not self.inverted)
 
     def __str__(self):
         """Recursively stringify this expression and its children."""
@@ -174,14 +225,22 @@ class Q(object):
         """Return a new Q object with `self` and `other` as children joined
         by `conn`.
         """
-        obj = type(self)()
-        obj.add(self)
-        obj.add(other)
-        obj.conn = conn
-        return obj
+        return type(self).create((self, other), conn)
+
+    def combine(self, child):
+        """Return a new node like this one, with `child`, a `Q` or
+        `(field_lookup, value)` tuple, added to its children.
+        """
+        return type(self).create(
+            self.children + (child,), self.conn, self.inverted
+        )
 
     def add(self, child):
-        self.children.append(child)
+        # Used to add `child` in place, so fail loudly rather than let
+        # callers that ignore a returned node silently drop the filter
+        raise AttributeError(
+            "Q objects are immutable, use Q.combine to add a child to a new one"
+        )
 
     def get_filters(self):
         filters = []
@@ -193,6 +252,61 @@ class Q(object):
         return filters
 
 
+class QueryTemplate(object):
+    """A query string compiled from a query with `Param`s for some of its
+    filter values, which can be rendered with values for those parameters
+    without walking the query's `Q` tree again. See `Query.prepare`.
+
+    Each parameter's field and filter expression are looked up once, here,
+    so rendering only needs to prep each value for filtering.
+    """
+    MARKER_REGEX = re.compile(u'\x00([^\x00\x01]*)\x01([^\x00]*)\x00')
+
+    def __init__(self, document_class, template_string):
+        self.document_class = document_class
+
+        # Splitting on the markers' two groups gives the text before each
+        # marker, its parameter name and filter lookup, then the final text
+        parts = self.MARKER_REGEX.split(template_string)
+        self.texts = parts[::3]
+        self.slots = []
+        doc_fields = document_class._meta.fields
+
+        for name, filter_lookup in zip(parts[1::3], parts[2::3]):
+            expr = FilterExpr(filter_lookup, None)
+            self.slots.append((name, expr, doc_fields[expr.prop_name]))
+
+    def get_param_names(self):
+        return set(name for name, _, _ in self.slots)
+
+    def render(self, params):
+        """Get the query string with the values in the dict `params` in place
+        of the parameters.
+        """
+        rendered = [self.texts[0]]
+
+        for (name, expr, field), text in zip(self.slots, self.texts[1:]):
+            try:
+                value = params[name]
+            except KeyError:
+                raise BadValueError(u'No value given for parameter %s' % name)
+
+            try:
+                value = field.prep_value_for_filter(value, filter_expr=expr)
+            except (TypeError, ValueError):
+                raise BadValueError(
+                    u'Value %s invalid for filtering on %s.%s (a %s)' % (
+                        value,
+                        self.document_class.__name__,
+                        expr.prop_name,
+                        type(field))
+                    )
+            rendered.append(expr.format(value))
+            rendered.append(text)
+
+        return u''.join(rendered)
+
+
 class Query(object):
     """Represents a search API query language string.
 
@@ -209,7 +323,7 @@ class Query(object):
     def __init__(self, document_class):
         self.document_class = document_class
         self._gathered_q = None
-        self._keywords = []
+        self._keywords = ()
 
     def __str__(self):
         return self.__unicode__()
@@ -229,6 +343,7 @@ class Query(object):
             self.document_class
         )
 
+        # Both are immutable, so they can be shared
         new_q._gathered_q = self._gathered_q
         new_q._keywords = self._keywords
 
@@ -252,7 +367,7 @@ class Query(object):
 
     def add_keywords(self, keywords):
         """Add keywords to the querystring"""
-        self._keywords.append(keywords)
+        self._keywords += (keywords,)
         return self
 
     def get_filters(self):
@@ -263,7 +378,7 @@ class Query(object):
     def get_keywords(self):
         return self._keywords
 
-    def unparse_filter(self, child):
+    def unparse_filter(self, child, template=False):
         """Unparse a `Q` object or tuple of the form `(field_lookup, value)`
         into the filters it represents. E.g.:
 
@@ -272,16 +387,25 @@ class Query(object):
         >>> query.unparse(q)
         "((title:'die hard') AND (rating >= 7))"
         """
-        # If we have a `Q` object, recursively unparse its children
+        # If we have a `Q` object, recursively unparse its children. Nodes
+        # never change, so the result is kept on the node and each part of a
+        # query that's shared with an earlier one (e.g. everything but the
+        # latest filter) is only unparsed once
         if isinstance(child, Q):
-            tmpl = u'(%s)'
-            if child.inverted:
-                tmpl = u'%s (%s)' % (child.NOT, '%s')
-
-            conn = u' %s ' % child.conn
-            return tmpl % (
-                conn.join([self.unparse_filter(c) for c in child.children])
-            )
+            key = (self.document_class, template)
+            compiled = child._compiled.get(key)
+            if compiled is None:
+                tmpl = u'(%s)'
+                if child.inverted:
+                    tmpl = u'%s (%s)' % (child.NOT, '%s')
+
+                conn = u' %s ' % child.conn
+                compiled = tmpl % (conn.join([
+                    self.unparse_filter(c, template=template)
+                    for c in child.children
+                ]))
+                child._compiled[key] = compiled
+            return compiled
 
         if child is None:
             return None
@@ -300,6 +424,14 @@ class Query(object):
             raise FieldLookupError(u'Prop name %s not in the field list for %s'
                 % (expr.prop_name, self.document_class.__name__))
 
+        if isinstance(value, Param):
+            if not template:
+                raise BadValueError(
+                    u'No value given for parameter %s, see SearchQuery.prepare'
+                    % value.name
+                )
+            return value.get_marker(filter_lookup)
+
         field = doc_fields[expr.prop_name]
         try:
             value = field.prep_value_for_filter(value, filter_expr=expr)
@@ -311,15 +443,15 @@ class Query(object):
                     expr.prop_name,
                     type(field))
                 )
-        # Create a new filter expression with the old filter lookup but with
-        # the newly converted value
-        return unicode(FilterExpr(filter_lookup, value).get_value())
+        # Use the newly converted value in the filter expression
+        expr.value = value
+        return unicode(expr.get_value())
 
-    def build_filters(self):
+    def build_filters(self, template=False):
         """Get the search API querystring representation for all gathered
         filters so far, ready for passing to the search API.
         """
-        return self.unparse_filter(self._gathered_q)
+        return self.unparse_filter(self._gathered_q, template=template)
 
     def build_keywords(self):
         """Get the search API querystring representation for the currently
@@ -328,9 +460,11 @@ class Query(object):
         if self._keywords:
             return self._clean(u' '.join(self._keywords))
 
-    def build_query(self):
-        """Build the full querystring"""
-        filters = self.build_filters()
+    def build_query(self, template=False):
+        """Build the full querystring, or if `template` is True, the string
+        for a `QueryTemplate` with markers in place of any `Param`s.
+        """
+        filters = self.build_filters(template=template)
         keywords = self.build_keywords()
 
         if filters and keywords:
@@ -340,3 +474,9 @@ class Query(object):
         if keywords:
             return keywords
         return u''
+
+    def prepare(self):
+        """Compile this query, with `Param`s for some of its filter values,
+        into a `QueryTemplate`.
+        """
+        return QueryTemplate(self.document_class, self.build_query(template=True))
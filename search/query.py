@@ -1,8 +1,67 @@
+import threading
+from collections import OrderedDict
+
 from google.appengine.api import search as search_api
 
-from . import ql
+from . import arrays, fields, ql
+from .cache import default_result_cache
+from .errors import BadValueError
+from .facets import (
+    Facet, decode_facets, parse_refinements, to_search_api_refinement
+)
 from .fields import NOT_SET
 from .indexers import PUNCTUATION_REGEX
+from .singleflight import get_search_scope
+from .utils import get_index_key
+
+
+# Index key (see `utils.get_index_key`) -> the number of times its documents
+# have changed in this process, which values kept in a `QueryMemo` are only
+# used for
+_index_generations = {}
+_index_generations_lock = threading.Lock()
+
+
+def invalidate_memos(index_key):
+    """Stop the values kept in every `QueryMemo` for queries on the index
+    with `index_key` being used. Called by `Index.invalidate_results`.
+    """
+    with _index_generations_lock:
+        _index_generations[index_key] = _index_generations.get(index_key, 0) + 1
+
+
+class QueryMemo(object):
+    """Keeps values worked out from the responses to a query and its clones
+    (e.g. counts), so that any of them can use the values, but only until
+    the index is next changed through an `indexes.Index` in this process
+    (see `invalidate_memos`), and only for the `max_size` most recently kept
+    keys, since a query can be cloned any number of times.
+    """
+    def __init__(self, max_size=100):
+        self.max_size = max_size
+
+        # Key -> (index generation, value)
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, index_key, key):
+        """Get the value kept for `key` from a query on the index with
+        `index_key`, or `None` if there isn't one or the index has changed.
+        """
+        generation, value = self._values.get(key, (None, None))
+        if generation != _index_generations.get(index_key, 0):
+            return None
+        return value
+
+    def set(self, index_key, key, value):
+        with self._lock:
+            self._values.pop(key, None)
+            self._values[key] = (_index_generations.get(index_key, 0), value)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
 
 
 def quote_if_special_characters(value):
@@ -31,42 +90,200 @@ def clean_snippet(snippet_value):
     return snippet_value
 
 
-def construct_document(document_class, document):
+def construct_document(document_class, document, lazy=False, trusted=True,
+        loaded=None):
     """Construct a document object of type `document_class` from `document`, a
     document returned from an App Engine Search API query.
 
-    This sets all the correct values for the fields on the new document and
-    annotates it with a function `get_snippets` that returns a list of
-    expressions returned for the original document.
+    The new document is actually an instance of `document_class`'s compact
+    result class (see `indexes.build_result_class`). This sets all the correct
+    values for the fields on the new document, along with its doc ID, rank and
+    the snippets returned for the original document, available from its
+    `get_snippets` method.
+
+    Since the values in `document` were validated when they were put, by
+    default they're decoded with `Field.from_search_value` and stored on the
+    new document as they are. Pass `trusted=False` to put them through each
+    field's full validation instead, as if they were being set by hand.
+
+    If `lazy` is True, the document keeps the raw values from `document` and
+    only decodes (without validating) each field the first time it's read.
+
+    If the query only returned some of the document's fields, `loaded` is the
+    set of their names. Reading any other field of the new document raises
+    `FieldNotLoadedError`, rather than silently giving its default value.
 
     TODO: Make all expressions available (not just snippets).
     """
+    return construct_documents(
+        document_class, [document], lazy=lazy, trusted=trusted, loaded=loaded
+    )[0]
+
+
+def construct_documents(document_class, documents, lazy=False, trusted=True,
+        loaded=None):
+    """Construct a document object of type `document_class` for each of
+    `documents`, as `construct_document` does.
+
+    Trusted values are decoded a field at a time across all the documents
+    with each field's bulk `from_search_values`, which is much quicker than
+    decoding each value on its own for a full page of results.
+    """
     fields = document_class._meta.fields
-    values = {}
-
-    for f in document.fields:
-        if f.name in fields:
-            value = fields[f.name].prep_value_from_search(f.value)
-            values[f.name] = value
-
-    doc = document_class(doc_id=document.doc_id, **values)
-
-    snippets = {}
-    if getattr(document, 'expressions', None):
-        for expr in document.expressions:
-            # Only add the snippet if the document has a value for that field
-            # (otherwise some snippets come back as '__NONE__', etc.)
-            if values.get(expr.name):
-                snippets[expr.name] = clean_snippet(expr.value)
-            else:
-                snippets[expr.name] = None
+    result_class = document_class._meta.result_class
+    slot_fields = result_class._slot_fields
+    docs, raws = [], []
+
+    if loaded is not None:
+        loaded = frozenset(loaded)
+        fields = {
+            name: field for name, field in fields.items() if name in loaded
+        }
+        slot_fields = tuple(
+            slot_field for slot_field in slot_fields
+            if slot_field.field.name in loaded
+        )
+
+    for document in documents:
+        raw = {}
+        for f in document.fields:
+            if f.name in fields:
+                raw[f.name] = f.value
+
+        doc = result_class.__new__(result_class)
+        doc._raw = raw if lazy else None
+        doc._loaded = loaded
+
+        if not lazy and not trusted:
+            for name, field in fields.items():
+                value = raw.get(name)
+                if value is not None:
+                    value = field.prep_value_from_search(value)
+                setattr(doc, name, value)
+
+        doc.doc_id = unicode(document.doc_id or '').encode('utf-8') or None
+        doc._rank = getattr(document, 'rank', None)
+
+        snippets = {}
+        if getattr(document, 'expressions', None):
+            for expr in document.expressions:
+                # Only add the snippet if the document has a value for that
+                # field (otherwise some snippets come back as '__NONE__', etc.)
+                # Fields that weren't returned can't be checked, but
+                # `clean_snippet` still drops snippets without a match
+                if raw.get(expr.name) or expr.name not in fields:
+                    snippets[expr.name] = clean_snippet(expr.value)
+                else:
+                    snippets[expr.name] = None
+        doc._snippets = snippets
+
+        docs.append(doc)
+        raws.append(raw)
+
+    if trusted and not lazy:
+        if len(docs) == 1:
+            # Not worth collecting each field's values into a list for
+            for slot_field in slot_fields:
+                slot_field.decode(docs[0], raws[0])
+        else:
+            for slot_field in slot_fields:
+                slot_field.decode_many(docs, raws)
+
+    return docs
+
+
+def construct_values(document_class, documents, field_names):
+    """Get the values of `field_names` for each of `documents`, documents
+    returned from an App Engine Search API query, as a list of tuples.
+
+    Unlike `construct_documents`, no document objects are constructed; each
+    field's values are just decoded together with the field's bulk
+    `from_search_values`. The name 'doc_id' can be used to get each
+    document's ID.
+    """
+    fields = document_class._meta.fields
+    raws = [{f.name: f.value for f in document.fields} for document in documents]
+    columns = []
+
+    for name in field_names:
+        if name == 'doc_id':
+            columns.append([
+                unicode(document.doc_id or '').encode('utf-8') or None
+                for document in documents
+            ])
+            continue
+
+        field = fields[name]
+        column = [raw.get(name) for raw in raws]
+        found = [i for i, value in enumerate(column) if value is not None]
+
+        if len(found) < len(column):
+            # Missing values get the default or none value for the field
+            missing = field.to_python(field.to_search_value(None))
+            column = [missing] * len(column)
+            decoded = field.from_search_values([raws[i][name] for i in found])
+            for i, value in zip(found, decoded):
+                column[i] = value
+        else:
+            column = field.from_search_values(column)
+        columns.append(column)
+
+    return zip(*columns) if columns else [()] * len(documents)
+
+
+class SearchFuture(object):
+    """The future for a search started by `SearchQuery._run_query_async`.
+
+    `get_result()` waits for the Search API's response (unless it came from
+    the query's search scope or result cache), caches it, and stores it on
+    the query as if the query had been run with `_run_query`.
+    """
+    def __init__(self, query, search_query, future=None, response=None,
+            cache_key=None, generation=None, scope=None):
+        self._query = query
+        self._search_query = search_query
+        self._future = future
+        self._response = response
+        self._cache_key = cache_key
+        self._generation = generation
+        self._scope = scope
+
+    def get_result(self):
+        if self._future is not None:
+            response = self._future.get_result()
+            self._future = None
+
+            result_cache = self._query._result_cache
+            if result_cache is not None:
+                result_cache.set(
+                    get_index_key(self._query.index),
+                    self._cache_key,
+                    response,
+                    self._generation
+                )
+            if self._scope is not None:
+                self._scope.set(
+                    get_index_key(self._query.index), self._cache_key, response
+                )
+            self._response = response
+            self._query._set_response(self._search_query, response)
+        return self._response
 
-    # This is hacky as hell - TODO: Make this a proper thing
-    def get_snippets():
-        return snippets
-    doc.get_snippets = get_snippets
 
-    return doc
+class ResultsFuture(object):
+    """The future returned by `SearchQuery.fetch_async`. `get_result()`
+    waits for the query's search, if it's still running, and returns the
+    list of its results.
+    """
+    def __init__(self, query, search_future=None):
+        self._query = query
+        self._search_future = search_future
+
+    def get_result(self):
+        if self._search_future is not None:
+            self._search_future.get_result()
+            self._search_future = None
+        return [result for result in self._query]
 
 
 class SearchQuery(object):
@@ -90,6 +307,13 @@ class SearchQuery(object):
     ASC = search_api.SortExpression.ASCENDING
     DESC = search_api.SortExpression.DESCENDING
 
+    # Attributes holding the results of running the query, which aren't
+    # copied to clones
+    RESULT_ATTRS = (
+        '_iter', '_number_found', '_results_cache', '_results_response',
+        '_search_future'
+    )
+
     def __init__(self, index, document_class=None, ids_only=False):
         """Arguments:
 
@@ -111,20 +335,57 @@ class SearchQuery(object):
         self._next_cursor = None
         self._has_set_limits = False
 
-        self._sorts = []
+        self._sorts = ()
         self._match_scorer = None
 
-        self._snippeted_fields = []
-        self._returned_expressions = []
+        self._snippeted_fields = ()
+        self._returned_expressions = ()
 
         self._offset = 0
         self._limit = self.MAX_LIMIT
 
+        # Whether to decode result fields only when they're read
+        self._lazy = False
+
+        # Field projection, see `only` and `defer`
+        self._only = None
+        self._deferred = ()
+
+        # Return dicts or tuples rather than documents, see `values` and
+        # `values_list`
+        self._values_fields = None
+        self._values_type = None
+
+        # See `cache`
+        self._result_cache = None
+
+        # See `prefetch`
+        self._prefetch = False
+
+        # See `facets` and `refine`
+        self._facets = ()
+        self._discover_facets = False
+        self._facet_options = ()
+        self._refinements = ()
+        # Facets key (see `get_facets_key`) -> decoded facet results, shared
+        # between clones like `_counts`
+        self._facet_results = QueryMemo()
+
+        # See `prepare` and `bind`
+        self._template = None
+        self._params = None
+        self._bound_query_string = None
+
         # Results
         self._iter = None
         self._number_found = None
+        # Count key (see `get_count_key`) -> number found, shared between
+        # clones, so that a count can come from any page of the same query
+        # already fetched since the index last changed
+        self._counts = QueryMemo()
         self._results_cache = None
         self._results_response = None
+        self._search_future = None
 
         # XXX: raw query
         self._raw_query = None
@@ -133,13 +394,17 @@ class SearchQuery(object):
         return bool(self.query)
 
     def __len__(self):
-        if self._number_found is None:
-            clone = self._clone()
-            clone._set_limits(0, 1)
-            clone._run_query()
-            clone.ids_only = True
-            return clone._number_found
-        return self._number_found
+        if self._number_found is not None:
+            return self._number_found
+
+        number_found = self._counts.get(
+            get_index_key(self.index), self.get_count_key()
+        )
+        if number_found is None:
+            count_query = self._get_count_query()
+            count_query._run_query()
+            number_found = count_query._number_found
+        return number_found
 
     def __iter__(self):
         if self._results_cache is None:
@@ -173,38 +438,99 @@ class SearchQuery(object):
             new_query._set_limits(s, s+1)
             return list(new_query)[0]
 
-    def _clone(self):
-        new_query = type(self)(
-            self.index,
-            document_class=self.document_class,
-            ids_only=self.ids_only
-        )
-        new_query._set_limits(self._offset, self._limit-self._offset)
-        new_query._cursor = self._cursor
-        new_query._next_cursor = self._next_cursor
-        new_query._sorts = self._sorts
-        new_query._snippeted_fields = self._snippeted_fields
-        new_query._returned_expressions = self._returned_expressions
-        new_query.query = self.query._clone()
+    def get_count_key(self):
+        """Get a key that's the same for any two queries that match the same
+        documents, whatever page of them they're for. Facet refinements
+        aren't part of the query string, but filter the documents too.
+        """
+        return (self.get_query_string(), self._refinements)
 
-        # XXX: Copy raw query in clone
-        new_query._raw_query = self._raw_query
+    def _get_count_query(self):
+        """Get the cheapest query that gets the same number found as this one,
+        i.e. for a single document ID.
+        """
+        clone = self._clone()
+        clone.ids_only = True
+        clone._cursor = None
+        clone._prefetch = False
+        clone._facets = ()
+        clone._discover_facets = False
+        clone._facet_options = ()
+        clone._set_limits(0, 1)
+        return clone
 
+    def _clone(self):
+        """Copy this query, apart from its results. Everything else about a
+        query is immutable (or, like `_counts`, meant to be shared), so this
+        only copies references, however many times the query's been cloned.
+        """
+        new_query = object.__new__(type(self))
+        new_query.__dict__.update(self.__dict__)
+        new_query.query = self.query._clone()
+        for name in self.RESULT_ATTRS:
+            setattr(new_query, name, None)
         return new_query
 
     def _results_iter(self):
         if self._results_response is None:
             self._run_query()
 
+        for result in self._construct_results(self._results_response.results):
+            self._results_cache.append(result)
+            yield result
+
+    def _construct_results(self, documents):
+        """Get what iterating over this query gives for each of the Search
+        API's `documents`: doc IDs, values or document instances.
+        """
         if self.ids_only:
-            for d in self._results_response:
-                self._results_cache.append(d.doc_id)
-                yield d.doc_id
-        else:
-            for d in self._results_response:
-                doc = construct_document(self.document_class, d)
-                self._results_cache.append(doc)
-                yield doc
+            return (d.doc_id for d in documents)
+
+        if self._values_type is not None:
+            field_names = self.get_values_fields()
+            rows = construct_values(self.document_class, documents, field_names)
+            if self._values_type is dict:
+                return (dict(zip(field_names, row)) for row in rows)
+            elif self._values_type == 'flat':
+                return (row[0] for row in rows)
+            return iter(rows)
+
+        return construct_documents(
+            self.document_class,
+            documents,
+            lazy=self._lazy,
+            loaded=self.get_returned_fields()
+        )
+
+    def iter_all(self, chunk_size=MAX_LIMIT):
+        """Iterate over every result of this query, however many there are,
+        fetching `chunk_size` results at a time with cursors. Unlike
+        iterating over the query itself, the results aren't kept, so only one
+        chunk of results is ever held in memory.
+
+        Any slicing of the query is ignored, but it starts from the query's
+        cursor if it has one. For a `prefetch` query, each chunk's search is
+        started while the chunk before it is being iterated over.
+        """
+        if not 0 < chunk_size <= self.MAX_LIMIT:
+            raise ValueError(
+                "chunk_size must be between 1 and %s" % self.MAX_LIMIT
+            )
+
+        page = self._clone()
+        page._set_limits(0, chunk_size)
+        page = page.set_cursor(self._cursor)
+
+        while True:
+            page._run_chunk_query()
+            results = page._results_response.results
+            for result in page._construct_results(results):
+                yield result
+
+            cursor = page.next_cursor
+            if not cursor or len(results) < chunk_size:
+                break
+            page = page.set_cursor(cursor)
 
     def _fill_cache(self, how_many):
         for i in range(how_many):
@@ -238,6 +564,30 @@ class SearchQuery(object):
     def count(self):
         return len(self)
 
+    def exists(self):
+        """Whether any documents match this query. Uses the count from any
+        page of this query already fetched, or else fetches a single document
+        ID.
+        """
+        return len(self) > 0
+
+    def first(self):
+        """Get the first result of this query, or `None` if there aren't any,
+        fetching only that one result if the query hasn't been run yet.
+        """
+        if self._results_response is not None:
+            if not self._results_response.results:
+                return None
+            if self._results_cache:
+                return self._results_cache[0]
+
+        clone = self._clone()
+        clone._prefetch = False
+        clone._set_limits(self._offset, self._offset + 1)
+        for result in clone:
+            return result
+        return None
+
     def filter(self, *args, **kwargs):
         """Add a filter constraint to the query from the `(prop name, value)`
         pairs in kwargs, similar to Django syntax:
@@ -248,6 +598,7 @@ class SearchQuery(object):
             cloned.query.add_q(q)
         if kwargs:
             cloned.query.add_q(ql.Q(**kwargs))
+        cloned._reprepare()
         return cloned
 
     def order_by(self, *fields):
@@ -268,20 +619,284 @@ class SearchQuery(object):
             field = document_fields[expression]
             default_value = (field.default if field.default is not NOT_SET
                 else field.none_value())
-            cloned._sorts.append(
+            cloned._sorts += (
                 search_api.SortExpression(
                     expression=expression,
                     default_value=default_value,
                     direction=direction
-                )
+                ),
             )
         return cloned
 
+    # Fields whose values the Search API can compare with `<` and `>`
+    KEYSET_FIELD_TYPES = (
+        fields.FloatField,
+        fields.IntegerField,
+        fields.BooleanField,
+        fields.DateField,
+        fields.DateTimeField,
+    )
+
+    def after(self, doc_or_sort_values, tie_breaker=None):
+        """Get the page of results after `doc_or_sort_values`, with filters on
+        the fields this query is ordered by rather than an offset, so every
+        page is as cheap as the first and there's no limit on how far in it
+        can be:
+
+        >>> films = index.search().order_by('-rating')
+        >>> page = list(films.after(None, tie_breaker='film_id')[:20])
+        >>> next_page = list(films.after(page[-1], tie_breaker='film_id')[:20])
+
+        `doc_or_sort_values` is the last result of the previous page (a
+        document, or a dict from `values`), the values of its sort fields in
+        order, or `None` for the first page.
+
+        Documents with the same values for every sort field would be skipped,
+        so `tie_breaker` names a field with unique values to order by last,
+        if the query isn't already ordered by it. Pass the same one for every
+        page. Like the sort fields, it has to be a number or date field (e.g.
+        an `IntegerField` copy of a primary key), so doc IDs and text fields
+        like the `pk` of `search.django` documents can't be used.
+
+        The Search API can only compare numbers and dates, so only numeric,
+        boolean and date fields can be ordered by. Documents without a value
+        for an ascending `DateField` sort last, and are included on the last
+        pages.
+        """
+        cloned = self._clone()
+        if tie_breaker is not None:
+            self._check_field_names([tie_breaker], 'order by')
+            if tie_breaker not in [sort.expression for sort in self._sorts]:
+                cloned = cloned.order_by(tie_breaker)
+
+        sorts = cloned._sorts
+        if not sorts:
+            raise ValueError("Only ordered queries can be paged with after()")
+
+        document_fields = self.document_class._meta.fields
+        for sort in sorts:
+            if not isinstance(document_fields[sort.expression], self.KEYSET_FIELD_TYPES):
+                raise BadValueError(
+                    u"Can't page after values of %s.%s, the Search API can "
+                    "only compare numbers and dates" % (
+                        self.document_class.__name__, sort.expression
+                    )
+                )
+
+        if doc_or_sort_values is None:
+            return cloned
+
+        values = self._get_sort_values(sorts, doc_or_sort_values)
+
+        # Later sort fields only decide the order when the earlier ones are
+        # equal, so e.g. for `order_by('a', '-b')` this builds:
+        # (a > x) OR (a >= x AND a <= x AND b < y)
+        after_q = None
+        for sort, value in reversed(zip(sorts, values)):
+            op = 'gt' if sort.direction == self.ASC else 'lt'
+            name = sort.expression
+            q = ql.Q(**{'%s__%s' % (name, op): value})
+            if (op == 'gt' and value is not None and
+                    isinstance(document_fields[name], fields.DateField)):
+                # Greater than filters on dates leave out missing dates (see
+                # `DateField.prep_value_for_filter`), which sort last
+                q |= ql.Q(**{name: None})
+            if after_q is not None:
+                equal_q = (
+                    ql.Q(**{'%s__gte' % name: value}) &
+                    ql.Q(**{'%s__lte' % name: value})
+                )
+                q |= equal_q & after_q
+            after_q = q
+
+        return cloned.filter(after_q)
+
+    def _get_sort_values(self, sorts, doc_or_sort_values):
+        names = [sort.expression for sort in sorts]
+
+        if isinstance(doc_or_sort_values, dict):
+            return [doc_or_sort_values.get(name) for name in names]
+
+        if isinstance(doc_or_sort_values, (list, tuple)):
+            if len(doc_or_sort_values) != len(names):
+                raise ValueError(
+                    "Expected a value for each of the sort fields: %s"
+                    % ', '.join(names)
+                )
+            return list(doc_or_sort_values)
+
+        return [getattr(doc_or_sort_values, name) for name in names]
+
     def keywords(self, keywords):
         cloned = self._clone()
         cloned.query.add_keywords(quote_if_special_characters(keywords))
+        cloned._reprepare()
+        return cloned
+
+    def prepare(self):
+        """Compile this query, with `ql.Param`s in place of some of its filter
+        values, so that it can be run with different values for them with
+        `bind` without building the whole query string each time:
+
+        >>> by_title = index.search().filter(
+        ...     title__contains=Param('title'),
+        ...     rating__gte=Param('rating')
+        ... ).prepare()
+        >>> by_title.bind(title='die hard', rating=7)
+
+        Fields and filter lookups are checked here, and only the values are
+        checked by `bind`.
+        """
+        cloned = self._clone()
+        cloned._template = self.query.prepare()
+        cloned._params = None
+        cloned._bound_query_string = None
+        return cloned
+
+    def bind(self, **params):
+        """Get a copy of this prepared query (see `prepare`) with the given
+        values for its parameters.
+        """
+        if self._template is None:
+            raise ValueError("Only prepared queries can be bound, see prepare()")
+
+        cloned = self._clone()
+        cloned._params = params
+        cloned._bound_query_string = self._template.render(params).encode('utf-8')
+        return cloned
+
+    def _reprepare(self):
+        """Recompile the template for a prepared query after its filters or
+        keywords have changed, keeping any values bound to it.
+        """
+        if self._template is not None:
+            self._template = self.query.prepare()
+            if self._params is not None:
+                self._bound_query_string = self._template.render(
+                    self._params
+                ).encode('utf-8')
+
+    def lazy(self, enabled=True):
+        """Construct the documents returned by this query lazily, so that each
+        field is only decoded from the search results the first time it's
+        read. Worthwhile when only a few fields of each result are used.
+        """
+        cloned = self._clone()
+        cloned._lazy = enabled
+        return cloned
+
+    def _check_field_names(self, field_names, action):
+        for field_name in field_names:
+            if field_name not in self.document_class._meta.fields:
+                raise ValueError(
+                    "Can't {} field {} since {} has no field by that name"
+                    .format(action, field_name, self.document_class.__name__)
+                )
+
+    def only(self, *fields):
+        """Only return the given fields of each document from the Search API,
+        rather than every field. Reading any other field from the documents
+        returned raises `FieldNotLoadedError`. Replaces the fields from any
+        previous call, and calling it with no fields returns every field again.
+        """
+        self._check_field_names(fields, 'return')
+        cloned = self._clone()
+        cloned._only = tuple(fields) or None
+        return cloned
+
+    def defer(self, *fields):
+        """Don't return the given fields of each document from the Search API,
+        e.g. large fields like a corpus that are only there to be searched.
+        Reading them from the documents returned raises `FieldNotLoadedError`.
+        Adds to the fields from any previous call, and calling it with no
+        fields clears them.
+        """
+        self._check_field_names(fields, 'defer')
+        cloned = self._clone()
+        cloned._deferred = cloned._deferred + tuple(fields) if fields else ()
+        return cloned
+
+    def get_returned_fields(self):
+        """Get the names of the fields to return from the Search API, or `None`
+        to return every field.
+        """
+        if self._only is None and not self._deferred:
+            return None
+
+        field_names = self._only or self.document_class._meta.fields.keys()
+        return sorted(set(field_names) - set(self._deferred))
+
+    def _values(self, fields, values_type):
+        self._check_field_names(
+            [name for name in fields if name != 'doc_id'], 'get values for'
+        )
+        cloned = self._clone()
+        cloned._values_fields = tuple(fields) or None
+        cloned._values_type = values_type
+
+        # Only return the fields that are needed from the Search API
+        field_names = [name for name in fields if name != 'doc_id']
+        if field_names:
+            cloned._only = tuple(field_names)
+            cloned._deferred = ()
         return cloned
 
+    def values(self, *fields):
+        """Return a dict of the given fields' values for each result, rather
+        than a document. This skips constructing documents at all, and only
+        the given fields are returned from the Search API. With no fields,
+        every field returned by the query is included.
+
+        'doc_id' can also be given to include each document's ID. If it's the
+        only field given, an ids-only search is run.
+        """
+        return self._values(fields, dict)
+
+    def values_list(self, *fields, **kwargs):
+        """Like `values`, but return a tuple of the given fields' values for
+        each result, or with `flat=True` and a single field, just its value.
+        """
+        flat = kwargs.pop('flat', False)
+        if kwargs:
+            raise TypeError(
+                'Unexpected keyword arguments to values_list: {}'
+                .format(kwargs.keys())
+            )
+        if flat and len(fields) != 1:
+            raise TypeError(
+                "'flat' is only valid when values_list is called with one field"
+            )
+        return self._values(fields, 'flat' if flat else tuple)
+
+    def get_values_fields(self):
+        """Get the names of the fields to get values for with `values` or
+        `values_list`
+        """
+        if self._values_fields is not None:
+            return list(self._values_fields)
+        return (self.get_returned_fields()
+            or sorted(self.document_class._meta.fields))
+
+    def to_arrays(self, *fields):
+        """Get the values of the given fields (or every field) for every
+        result of this query, as a dict of field name to NumPy array, e.g. for
+        computing statistics over a whole set of results. Requires NumPy.
+
+        Results are fetched a page at a time with cursors (starting from this
+        query's cursor, if it has one), ignoring any limits on this query, and
+        each page's values are copied into the arrays column by column,
+        without constructing any documents.
+
+        Missing values are NaN in float fields, NaT in date and datetime
+        fields (as naive UTC `datetime64` values), masked in integer and
+        boolean fields (which are `numpy.ma.MaskedArray`s), and None in
+        object arrays for any other fields.
+        """
+        self._check_field_names(fields, 'get values for')
+        field_names = (list(fields) or self.get_returned_fields()
+            or sorted(self.document_class._meta.fields))
+        return arrays.to_arrays(self, field_names, self.MAX_LIMIT)
+
     def raw(self, query_string):
         """Execute a raw query directly. This will overwrite any filters or
         keywords previously added to the query, but keep sorting, snippeting,
@@ -316,19 +931,14 @@ class SearchQuery(object):
     def snippet(self, *fields):
         """Add fields to get snippets for when this query is run"""
         cloned = self._clone()
-        for field_name in fields:
-            if field_name not in self.document_class._meta.fields:
-                raise ValueError(
-                    "Can't snippet field {} since {} has no field by that name"
-                    .format(field_name, self.document_class.__name__)
-                )
-        cloned._snippeted_fields.extend(fields)
+        self._check_field_names(fields, 'snippet')
+        cloned._snippeted_fields += tuple(fields)
         return cloned
 
     def add_expression(self, name, expression):
         cloned = self._clone()
         expr = search_api.FieldExpression(name=name, expression=expression)
-        cloned._returned_expressions.append(expr)
+        cloned._returned_expressions += (expr,)
         return cloned
 
     def get_snippet_words(self):
@@ -353,10 +963,12 @@ class SearchQuery(object):
         do come back highlighted if they're present in any of the fields being
         snippeted.
         """
+        params = self._params or {}
         snippet_words = [
-            v for k, v in self.query.get_filters()
-            if isinstance(v, basestring)
+            params.get(v.name) if isinstance(v, ql.Param) else v
+            for k, v in self.query.get_filters()
         ]
+        snippet_words = [v for v in snippet_words if isinstance(v, basestring)]
         snippet_words += self.query.get_keywords()
         # If someone quotes a seach query the snippeting will break, so we
         # have to strip them here
@@ -375,22 +987,22 @@ class SearchQuery(object):
             )
         return field_expressions
 
-    def _run_query(self):
+    def get_query_string(self):
+        if self._raw_query is not None:
+            return self._raw_query
+        if self._bound_query_string is not None:
+            return self._bound_query_string
+        return str(self.query)
+
+    def get_search_query(self):
+        """Build the Search API `Query` to run for this query"""
         if self._cursor:
             offset = None
         else:
             offset = self._offset
 
-        limit = self._limit
-        sort_expressions = self._sorts
-
-        if self._raw_query is not None:
-            query_string = self._raw_query
-        else:
-            query_string = str(self.query)
-
         kwargs = {
-            "expressions": sort_expressions
+            "expressions": list(self._sorts)
         }
         if self._match_scorer:
             kwargs["match_scorer"] = self._match_scorer
@@ -398,21 +1010,343 @@ class SearchQuery(object):
         snippet_words = self.get_snippet_words()
         field_expressions = self.get_snippet_expressions(snippet_words)
 
+        # Searches for only 'doc_id' values don't need any fields at all
+        ids_only = self.ids_only or self._values_fields == ('doc_id',)
+
         sort_options = search_api.SortOptions(**kwargs)
         search_options = search_api.QueryOptions(
             offset=offset,
-            limit=limit,
+            limit=self._limit,
             sort_options=sort_options,
-            ids_only=self.ids_only,
+            ids_only=ids_only,
             number_found_accuracy=100,
+            returned_fields=None if ids_only else self.get_returned_fields(),
             returned_expressions=field_expressions,
             cursor=self._cursor
         )
-        search_query = search_api.Query(
-            query_string=query_string,
-            options=search_options
+        facet_kwargs = {}
+        if self._facets:
+            document_fields = self.document_class._meta.fields
+            facet_kwargs['return_facets'] = [
+                facet.to_search_api(document_fields.get(facet.name))
+                for facet in self._facets
+            ]
+        if self._discover_facets:
+            facet_kwargs['enable_facet_discovery'] = True
+        if self._facet_options:
+            facet_kwargs['facet_options'] = search_api.FacetOptions(
+                **dict(self._facet_options)
+            )
+        if self._refinements:
+            facet_kwargs['facet_refinements'] = [
+                to_search_api_refinement(self.document_class, refinement)
+                for refinement in self._refinements
+            ]
+
+        return search_api.Query(
+            query_string=self.get_query_string(),
+            options=search_options,
+            **facet_kwargs
         )
 
-        self._results_response = self.index.search(search_query)
+    def get_cache_key(self, search_query):
+        """Get a key that's the same for any two queries that would get the
+        same response from the Search API, given `search_query`, the Search
+        API `Query` built for this query.
+        """
+        options = search_query.options
+        sort_options = options.sort_options
+        cursor = options.cursor
+
+        return (
+            search_query.query_string,
+            options.offset,
+            options.limit,
+            cursor and (cursor.web_safe_string, cursor.per_result),
+            tuple(
+                (expr.expression, expr.direction, expr.default_value)
+                for expr in sort_options.expressions or ()
+            ),
+            sort_options.match_scorer and type(sort_options.match_scorer).__name__,
+            tuple(
+                (expr.name, expr.expression)
+                for expr in options.returned_expressions or ()
+            ),
+            tuple(options.returned_fields or ()),
+            options.ids_only,
+            self.get_facets_key()[1:],
+        )
+
+    def cache(self, result_cache=None):
+        """Cache the response to this query in `result_cache` (see
+        `cache.ResultCache`), or the default result cache if not given, and
+        use the cached response to any identical query run before it instead
+        of running it again. Pass `False` to stop caching a query.
+
+        Queries from an `Index` with a `result_cache` are cached in it to
+        begin with.
+        """
+        if result_cache is None:
+            result_cache = default_result_cache
+        cloned = self._clone()
+        cloned._result_cache = None if result_cache is False else result_cache
+        return cloned
+
+    def facets(self, *facets, **options):
+        """Get facet results (see `get_facets`) for the facets named in
+        `facets`, or described by `facets.Facet`s, along with this query's
+        results. With `discover=True`, the Search API picks the facets with
+        the most values in the matching documents too.
+
+        Any other keyword arguments are passed to the Search API's
+        `FacetOptions`: `discovery_limit` (the number of facets to discover),
+        `discovery_value_limit` (the number of values to count for each
+        discovered facet) and `depth` (the number of matching documents to
+        count facet values in).
+
+        >>> query.facets('genre', Facet('rating', ranges=[(0, 3), (3, 5)]))
+        """
+        discover = options.pop('discover', False)
+        unknown = set(options) - set(['discovery_limit', 'discovery_value_limit', 'depth'])
+        if unknown:
+            raise TypeError(
+                "Unexpected facet options: %s" % ', '.join(sorted(unknown))
+            )
+
+        cloned = self._clone()
+        cloned._facets += tuple(
+            facet if isinstance(facet, Facet) else Facet(facet)
+            for facet in facets
+        )
+        cloned._discover_facets = cloned._discover_facets or discover
+        if options:
+            cloned._facet_options = tuple(
+                sorted(dict(self._facet_options, **options).items())
+            )
+        return cloned
+
+    def refine(self, **refinements):
+        """Only match documents with the given facet values. Each value can
+        be a single value, a `(start, end)` tuple for a range of number-like
+        values (either end can be `None`), or a list of either. Documents
+        match if they have any of the values given for a facet, and match
+        every facet given:
+
+        >>> query.refine(genre=['action', 'comedy'], rating=(3, None))
+        """
+        cloned = self._clone()
+        for name, value in sorted(refinements.items()):
+            cloned._refinements += tuple(parse_refinements(name, value))
+        return cloned
+
+    def get_facets_key(self):
+        """Get a key that's the same for any two queries that get the same
+        facet results, whatever page of results they're for.
+        """
+        return (
+            self.get_query_string(),
+            tuple(facet.get_key() for facet in self._facets),
+            self._discover_facets,
+            self._facet_options,
+            self._refinements,
+        )
+
+    def get_facets(self):
+        """Get the facet results for this query (see `facets`), as a dict of
+        each facet's name to a list of `facets.FacetValue`s, i.e. the number
+        of matching documents with each of its values.
+
+        Facet results come back with each page of results, and are kept for
+        every clone of this query, so e.g. paging through results or reading
+        them for each facet in a sidebar doesn't fetch them again. If the
+        query hasn't been run, a search for just the facet results is made.
+        """
+        if not (self._facets or self._discover_facets):
+            raise ValueError("No facets were asked for, see facets()")
+
+        facet_results = self._facet_results.get(
+            get_index_key(self.index), self.get_facets_key()
+        )
+        if facet_results is None:
+            facet_query = self._clone()
+            facet_query.ids_only = True
+            facet_query._cursor = None
+            facet_query._prefetch = False
+            facet_query._sorts = ()
+            facet_query._snippeted_fields = ()
+            facet_query._returned_expressions = ()
+            facet_query._set_limits(0, 1)
+            facet_query._run_query()
+            facet_results = decode_facets(
+                self.document_class, facet_query._results_response.facets
+            )
+        return facet_results
+
+    def prefetch(self, enabled=True):
+        """Start searching for the next page of results as soon as each page
+        of this query is fetched, so that it's ready (or at least on its way)
+        by the time it's asked for, e.g. by `SearchPaginator` or an infinite
+        scrolling client.
+
+        This only applies to pages of results, i.e. sliced queries, or queries
+        with a cursor (for which the next page is the one after the returned
+        cursor), run while a `singleflight.SearchScope` is open (e.g. with
+        `search.django.middleware.SearchScopeMiddleware`). The next page's
+        search is kept by the scope for up to a few seconds, until a query for
+        the same page is run before the scope is closed, since App Engine
+        RPCs can't outlive the request that started them. If the query has a
+        result cache, the next page's response is put in the cache when that
+        happens too.
+        """
+        cloned = self._clone()
+        cloned._prefetch = enabled
+        return cloned
+
+    def fetch_async(self):
+        """Start fetching this query's results without waiting for them.
+        Returns a future, whose `get_result()` returns the list of results.
+        """
+        if self._results_response is None and self._search_future is None:
+            self._search_future = self._run_query_async()
+        return ResultsFuture(self, self._search_future)
+
+    def _run_query(self):
+        if self._search_future is not None:
+            self._search_future.get_result()
+            return
+
+        scope = get_search_scope()
+        if scope is None:
+            self._run_query_async().get_result()
+            return
+
+        # Identical searches in the same scope share a single RPC
+        search_query = self.get_search_query()
+        key = self.get_cache_key(search_query)
+        response = scope.search(
+            get_index_key(self.index),
+            key,
+            lambda: self._run_query_async(search_query, key).get_result()
+        )
+        if self._results_response is not response:
+            self._set_response(search_query, response)
+
+    def _run_query_async(self, search_query=None, key=None):
+        """Start running this query with an async search, unless its response
+        is in the open `SearchScope` or the result cache. Returns a
+        `SearchFuture`, which stores the response on this query once it's
+        waited on.
+        """
+        search_query = search_query or self.get_search_query()
+        result_cache = self._result_cache
+        generation = None
+
+        scope = get_search_scope()
+        if scope is not None:
+            key = key or self.get_cache_key(search_query)
+            response = scope.get(get_index_key(self.index), key)
+            if response is not None:
+                self._set_response(search_query, response)
+                return SearchFuture(self, search_query, response=response)
+
+        if result_cache is not None:
+            key = key or self.get_cache_key(search_query)
+            response, generation = result_cache.get(get_index_key(self.index), key)
+            if response is not None:
+                self._set_response(search_query, response)
+                return SearchFuture(self, search_query, response=response)
+
+        future = None
+        if self._prefetch and scope is not None:
+            key = key or self.get_cache_key(search_query)
+            future = scope.prefetched.pop(get_index_key(self.index), key)
+
+        return SearchFuture(
+            self,
+            search_query,
+            future=future or self.index.search_async(search_query),
+            cache_key=key,
+            generation=generation,
+            scope=scope
+        )
+
+    def _run_chunk_query(self):
+        """Run this query as one chunk of `iter_all` or `to_arrays`. Unlike
+        `_run_query`, the response isn't kept in the open `SearchScope` or the
+        result cache, so that only the chunk being read is held in memory.
+        """
+        search_query = self.get_search_query()
+        scope = get_search_scope()
+        future = None
+        if self._prefetch and scope is not None:
+            key = self.get_cache_key(search_query)
+            future = scope.prefetched.pop(get_index_key(self.index), key)
+
+        future = future or self.index.search_async(search_query)
+        self._set_response(search_query, future.get_result())
+
+    def _set_response(self, search_query, response):
+        self._results_response = response
         self._number_found = self._results_response.number_found
+        self._counts.set(
+            get_index_key(self.index),
+            (search_query.query_string, self._refinements),
+            self._number_found
+        )
         self._next_cursor = self._results_response.cursor
+
+        if self._facets or self._discover_facets:
+            self._facet_results.set(
+                get_index_key(self.index),
+                self.get_facets_key(),
+                decode_facets(self.document_class, response.facets)
+            )
+
+        if self._prefetch:
+            self._prefetch_next_page()
+
+    def _get_next_page_query(self):
+        """Get the query for the page of results after this one, or `None` if
+        this is the last page.
+        """
+        response = self._results_response
+        if len(response.results) < self._limit:
+            return None
+
+        next_query = self._clone()
+        next_query._prefetch = False
+
+        if self._cursor is not None:
+            if not response.cursor:
+                return None
+            next_query._cursor = response.cursor
+        else:
+            offset = self._offset + self._limit
+            if offset >= response.number_found or offset > self.MAX_OFFSET:
+                return None
+            next_query._set_limits(offset, offset + self._limit)
+        return next_query
+
+    def _prefetch_next_page(self):
+        scope = get_search_scope()
+        if scope is None or not (self._has_set_limits or self._cursor is not None):
+            return
+
+        next_query = self._get_next_page_query()
+        if next_query is None:
+            return
+
+        search_query = next_query.get_search_query()
+        key = next_query.get_cache_key(search_query)
+        index_key = get_index_key(self.index)
+
+        if (index_key, key) in scope.prefetched or scope.get(index_key, key):
+            return
+        if self._result_cache is not None:
+            response, _ = self._result_cache.get(index_key, key)
+            if response is not None:
+                return
+
+        scope.prefetched.add(
+            index_key, key, self.index.search_async(search_query)
+        )
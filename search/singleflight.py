@@ -0,0 +1,153 @@
+"""Deduplication of identical searches, see `SearchScope`."""
+import threading
+
+from .prefetch import PrefetchRegistry
+
+
+_local = threading.local()
+
+
+def get_search_scope():
+    """Get the search scope that's currently open on this thread, or `None`
+    if searches shouldn't be deduplicated.
+    """
+    scopes = getattr(_local, 'scopes', None)
+    return scopes[-1] if scopes else None
+
+
+class _Call(object):
+    """A function call in flight in a `SingleFlight`"""
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """Makes sure only one call is in flight for each key at a time. Threads
+    that call `do` with a key that's already in flight wait for that call to
+    finish and get its result (or its error) instead of making their own.
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._calls)
+
+    def do(self, key, fn):
+        """Call `fn` and return its result, unless a call for `key` is already
+        in flight, in which case wait for that call's result instead.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+# Shared by every scope, so that identical searches on different threads
+# wait on the same RPC
+default_single_flight = SingleFlight()
+
+
+class SearchScope(object):
+    """Deduplicates the searches run while it's open (e.g. for the length of a
+    request, see `search.django.middleware.SearchScopeMiddleware`):
+
+        * A search that's already in flight, on any thread, is waited on
+          rather than sent again (see `SingleFlight`)
+        * The responses to searches are kept until the scope is closed, so
+          running the same search again doesn't need an RPC at all
+        * Searches for the next page of `SearchQuery.prefetch` queries are
+          kept in `prefetched` until the page is asked for or the scope is
+          closed
+
+    Searches are identified by the namespace and name of their index (see
+    `utils.get_index_key`) as well as the query, so searches on indexes with
+    the same name in different namespaces are never shared. Responses for an
+    index are forgotten as soon as documents are put in or deleted from it
+    through an `indexes.Index` on the same thread.
+
+    >>> with SearchScope():
+    ...     len(query)
+    ...     list(query[:20])
+    ...     list(query[:20])  # No RPC
+    """
+    def __init__(self, single_flight=None):
+        if single_flight is None:
+            single_flight = default_single_flight
+        self.single_flight = single_flight
+        # (index key, query key) -> response
+        self._responses = {}
+        self.prefetched = PrefetchRegistry()
+
+    def __len__(self):
+        return len(self._responses)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *args, **kwargs):
+        self.close()
+
+    def open(self):
+        """Start deduplicating searches run on this thread"""
+        if not hasattr(_local, 'scopes'):
+            _local.scopes = []
+        _local.scopes.append(self)
+        return self
+
+    def close(self):
+        """Stop deduplicating searches and forget their responses, and any
+        prefetched searches
+        """
+        scopes = getattr(_local, 'scopes', [])
+        if self in scopes:
+            scopes.remove(self)
+        self._responses.clear()
+        self.prefetched.clear()
+
+    def search(self, index_key, key, fn):
+        """Get the response to the search with `key` (see
+        `SearchQuery.get_cache_key`) on the index with `index_key`, calling
+        `fn` to run it if it hasn't been run in this scope.
+        """
+        scope_key = (index_key, key)
+        response = self._responses.get(scope_key)
+        if response is None:
+            response = self.single_flight.do(scope_key, fn)
+            self._responses[scope_key] = response
+        return response
+
+    def get(self, index_key, key):
+        return self._responses.get((index_key, key))
+
+    def set(self, index_key, key, response):
+        self._responses[(index_key, key)] = response
+
+    def invalidate(self, index_key):
+        """Forget the responses to searches on the index with `index_key`,
+        and any prefetched searches on it
+        """
+        for scope_key in self._responses.keys():
+            if scope_key[0] == index_key:
+                del self._responses[scope_key]
+        self.prefetched.invalidate(index_key)
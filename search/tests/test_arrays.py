@@ -0,0 +1,66 @@
+import datetime
+
+import numpy
+
+from ..arrays import to_arrays
+from ..fields import DateField, DateTimeField, FloatField, IntegerField, TextField
+from ..indexes import DocumentModel, Index
+
+from .base import AppengineTestCase
+
+
+class StatsDocument(DocumentModel):
+    name = TextField()
+    score = FloatField()
+    votes = IntegerField()
+    released = DateField()
+    updated = DateTimeField()
+
+
+class TestToArrays(AppengineTestCase):
+    def setUp(self):
+        super(TestToArrays, self).setUp()
+        self.idx = Index('dummy', StatsDocument)
+        self.idx.put([
+            StatsDocument(
+                doc_id=str(i),
+                name='doc %d' % i,
+                score=i / 2.0,
+                votes=i,
+                released=datetime.date(2017, 1, i + 1),
+                updated=datetime.datetime(2017, 1, 1, 12, i)
+            )
+            for i in range(5)
+        ])
+        self.idx.put(StatsDocument(doc_id='5'))
+
+    def test_to_arrays(self):
+        arrays = self.idx.search().order_by('-votes').to_arrays()
+
+        self.assertEqual(
+            sorted(arrays),
+            ['name', 'released', 'score', 'updated', 'votes']
+        )
+        self.assertEqual(arrays['name'].dtype, object)
+        self.assertEqual(arrays['name'][0], 'doc 4')
+        self.assertEqual(arrays['score'][:5].tolist(), [2, 1.5, 1, 0.5, 0])
+        self.assertTrue(numpy.isnan(arrays['score'][5]))
+        self.assertEqual(arrays['votes'].sum(), 10)
+        self.assertTrue(arrays['votes'].mask[5])
+        self.assertEqual(
+            arrays['released'][0],
+            numpy.datetime64('2017-01-05')
+        )
+        self.assertTrue(numpy.isnat(arrays['released'][5]))
+        self.assertEqual(
+            arrays['updated'][3],
+            numpy.datetime64('2017-01-01T12:01:00')
+        )
+        self.assertTrue(numpy.isnat(arrays['updated'][5]))
+
+    def test_pages_with_cursors(self):
+        q = self.idx.search().order_by('votes')
+        arrays = to_arrays(q, ['votes'], 2)
+
+        self.assertEqual(len(arrays['votes']), 6)
+        self.assertEqual(arrays['votes'].compressed().tolist(), range(5))
@@ -0,0 +1,68 @@
+import time
+
+from ..buffer import WriteBuffer, get_write_buffer
+from ..fields import TextField
+from ..indexes import DocumentModel, Index
+
+from .base import AppengineTestCase
+
+
+class FakeDocument(DocumentModel):
+    foo = TextField()
+
+
+class TestWriteBuffer(AppengineTestCase):
+    def test_writes_sent_on_exit(self):
+        idx = Index('dummy', FakeDocument)
+
+        with WriteBuffer() as write_buffer:
+            self.assertIs(get_write_buffer(), write_buffer)
+            idx.put(FakeDocument(doc_id='a', foo='thing'))
+            idx.put(FakeDocument(doc_id='b', foo='thing2'))
+            self.assertEqual(len(write_buffer), 2)
+            self.assertEqual(idx.get_range(ids_only=True), [])
+
+        self.assertIsNone(get_write_buffer())
+        self.assertEqual(idx.get_range(ids_only=True), ['a', 'b'])
+
+    def test_delete_after_put_collapses(self):
+        idx = Index('dummy', FakeDocument)
+        idx.put(FakeDocument(doc_id='a', foo='thing'))
+
+        with WriteBuffer() as write_buffer:
+            idx.put(FakeDocument(doc_id='a', foo='thing2'))
+            idx.delete('a')
+            self.assertEqual(len(write_buffer), 1)
+
+        self.assertEqual(idx.get_range(ids_only=True), [])
+
+    def test_flush_on_max_size(self):
+        idx = Index('dummy', FakeDocument)
+
+        with WriteBuffer(max_size=2) as write_buffer:
+            idx.put(FakeDocument(doc_id='a', foo='thing'))
+            self.assertEqual(len(write_buffer), 1)
+            idx.put(FakeDocument(doc_id='b', foo='thing2'))
+            self.assertEqual(len(write_buffer), 0)
+            self.assertEqual(idx.get_range(ids_only=True), ['a', 'b'])
+
+    def test_flush_on_max_delay(self):
+        idx = Index('dummy', FakeDocument)
+        other_idx = Index('other', FakeDocument)
+
+        with WriteBuffer(max_size=2, max_delay=0.1) as write_buffer:
+            idx.put(FakeDocument(doc_id='a', foo='thing'))
+            time.sleep(0.15)
+            idx.put(FakeDocument(doc_id='b', foo='thing2'))
+            self.assertEqual(len(write_buffer), 0)
+
+            # The delay starts again for writes after a flush
+            idx.put(FakeDocument(doc_id='c', foo='thing3'))
+            self.assertEqual(len(write_buffer), 1)
+
+            # Only the index with writes older than the delay is flushed
+            time.sleep(0.15)
+            other_idx.put(FakeDocument(doc_id='d', foo='thing4'))
+            self.assertEqual(len(write_buffer), 1)
+            self.assertEqual(idx.get_range(ids_only=True), ['a', 'b', 'c'])
+            self.assertEqual(other_idx.get_range(ids_only=True), [])
@@ -0,0 +1,84 @@
+from ..buffer import WriteBuffer
+from ..cache import ResultCache
+from ..fields import TextField
+from ..indexes import DocumentModel, Index
+
+from .base import AppengineTestCase
+
+
+class FakeDocument(DocumentModel):
+    foo = TextField()
+
+
+class TestResultCache(AppengineTestCase):
+    def setUp(self):
+        super(TestResultCache, self).setUp()
+        self.idx = Index('dummy', FakeDocument)
+        self.idx.put(FakeDocument(doc_id='a', foo='thing'))
+
+    def test_cached_response(self):
+        result_cache = ResultCache()
+        q = self.idx.search().cache(result_cache).filter(foo='thing')
+
+        self.assertEqual([d.doc_id for d in q], ['a'])
+        self.assertEqual((result_cache.hits, result_cache.misses), (0, 1))
+
+        # An identical query uses the cached response, even though the
+        # document's gone
+        self.idx.delete('a')
+        q = self.idx.search().cache(result_cache).filter(foo='thing')
+        self.assertEqual([d.doc_id for d in q], ['a'])
+        self.assertEqual((result_cache.hits, result_cache.misses), (1, 1))
+
+        # Anything else about the query changing misses the cache
+        self.assertEqual([d for d in q.order_by('foo')], [])
+        self.assertEqual([d for d in q[:1]], [])
+        self.assertEqual((result_cache.hits, result_cache.misses), (1, 3))
+
+        result_cache.invalidate(('', 'dummy'))
+        q = self.idx.search().cache(result_cache).filter(foo='thing')
+        self.assertEqual([d for d in q], [])
+
+    def test_namespaces(self):
+        result_cache = ResultCache()
+        other_idx = Index('dummy', FakeDocument, namespace='other')
+        other_idx.put(FakeDocument(doc_id='b', foo='thing'))
+
+        self.assertEqual([d.doc_id for d in self.idx.search().cache(result_cache)], ['a'])
+        self.assertEqual([d.doc_id for d in other_idx.search().cache(result_cache)], ['b'])
+        self.assertEqual((result_cache.hits, result_cache.misses), (0, 2))
+
+    def test_timeouts(self):
+        result_cache = ResultCache(index_timeouts={'dummy': 0})
+        [d for d in self.idx.search().cache(result_cache)]
+        self.assertEqual(len(result_cache), 0)
+
+        result_cache = ResultCache(empty_timeout=0)
+        empty_idx = Index('empty', FakeDocument)
+        [d for d in empty_idx.search().cache(result_cache)]
+        self.assertEqual(len(result_cache), 0)
+        [d for d in self.idx.search().cache(result_cache)]
+        self.assertEqual(len(result_cache), 1)
+
+    def test_max_size(self):
+        result_cache = ResultCache(max_size=1)
+        q = self.idx.search().cache(result_cache)
+        [d for d in q.filter(foo='thing')]
+        [d for d in q.filter(foo='other')]
+        [d for d in q.filter(foo='thing')]
+        self.assertEqual(result_cache.get_stats(), {'hits': 0, 'misses': 3, 'size': 1})
+
+    def test_index_invalidates_on_write(self):
+        result_cache = ResultCache()
+        idx = Index('dummy', FakeDocument, result_cache=result_cache)
+
+        self.assertEqual([d.doc_id for d in idx.search()], ['a'])
+        idx.put(FakeDocument(doc_id='b', foo='thing2'))
+        self.assertEqual(sorted(d.doc_id for d in idx.search()), ['a', 'b'])
+        idx.delete('a')
+        self.assertEqual([d.doc_id for d in idx.search()], ['b'])
+        self.assertEqual((result_cache.hits, result_cache.misses), (0, 3))
+
+        with WriteBuffer():
+            idx.put(FakeDocument(doc_id='c', foo='thing3'))
+        self.assertEqual(sorted(d.doc_id for d in idx.search()), ['b', 'c'])
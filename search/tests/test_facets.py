@@ -0,0 +1,124 @@
+import datetime
+import unittest
+
+from google.appengine.api import search as search_api
+
+from ..errors import FieldError
+from ..facets import Facet, FacetValue
+from ..fields import (
+    AtomField, DateField, DateTimeField, FloatField, IntegerField, TextField
+)
+from ..indexes import DocumentModel, Index
+
+from .base import AppengineTestCase
+
+
+class FilmDocument(DocumentModel):
+    title = TextField()
+    genre = AtomField(facet=True)
+    rating = FloatField(facet=True)
+    year = IntegerField(facet=True)
+    released = DateTimeField(facet=True)
+
+
+class TestFacetFields(unittest.TestCase):
+    def test_serialized_facets(self):
+        doc = FilmDocument(genre='action', rating=4.5)
+        search_doc = doc._to_search_document()
+
+        facets = dict((f.name, f) for f in search_doc.facets)
+        self.assertIsInstance(facets['genre'], search_api.AtomFacet)
+        self.assertEqual(facets['genre'].value, 'action')
+        self.assertIsInstance(facets['rating'], search_api.NumberFacet)
+        self.assertEqual(facets['rating'].value, 4.5)
+        # Missing values don't get a facet
+        self.assertNotIn('year', facets)
+        self.assertNotIn('title', facets)
+
+    def test_unsupported_fields(self):
+        self.assertRaises(FieldError, DateField, facet=True)
+        self.assertRaises(FieldError, TextField, indexer=lambda v: [v], facet=True)
+
+    def test_decode_values(self):
+        field = FilmDocument._meta.fields['released']
+        released = datetime.datetime(2016, 12, 31, 12)
+        value = field.to_facet_value(field.to_search_value(released))
+
+        self.assertEqual(field.from_facet_value(str(float(value))), released)
+        self.assertEqual(FilmDocument._meta.fields['year'].from_facet_value('1999.0'), 1999)
+
+
+class TestFacetQuery(AppengineTestCase):
+    def setUp(self):
+        super(TestFacetQuery, self).setUp()
+        self.idx = Index('films', FilmDocument)
+        self.idx.put([
+            FilmDocument(doc_id='a', genre='action', rating=4.5, year=1988),
+            FilmDocument(doc_id='b', genre='action', rating=2.5, year=1990),
+            FilmDocument(doc_id='c', genre='comedy', rating=3.5, year=1990),
+        ])
+
+    def test_explicit_facets(self):
+        q = self.idx.search().facets(
+            'genre', Facet('rating', ranges=[(None, 3), (3, None)])
+        )
+
+        facets = q.get_facets()
+        self.assertEqual(
+            facets['genre'],
+            [FacetValue('action', 'action', 2), FacetValue('comedy', 'comedy', 1)]
+        )
+        self.assertEqual(
+            sorted(v.value for v in facets['rating']),
+            [(None, 3.0), (3.0, None)]
+        )
+
+    def test_discovered_facets(self):
+        q = self.idx.search().facets(discover=True, discovery_limit=5)
+        self.assertEqual(
+            q.get_search_query().facet_options.discovery_limit, 5
+        )
+
+        facets = q.get_facets()
+        self.assertEqual(sorted(facets), ['genre', 'rating', 'year'])
+        self.assertEqual(facets['year'][0], FacetValue('1990.0', 1990, 2))
+
+        self.assertRaises(TypeError, q.facets, depth=10, limit=5)
+
+    def test_refine(self):
+        q = self.idx.search().refine(genre='action', rating=(3, None))
+        self.assertEqual([d.doc_id for d in q], ['a'])
+
+        q = self.idx.search().refine(genre=['action', 'comedy'], year=1990)
+        self.assertEqual(sorted(d.doc_id for d in q), ['b', 'c'])
+
+    def test_refined_count(self):
+        q = self.idx.search()
+        refined = q.refine(genre='comedy')
+
+        self.assertEqual([d.doc_id for d in refined], ['c'])
+        self.assertEqual(refined.count(), 1)
+        self.assertEqual(q.count(), 3)
+        self.assertEqual(q.refine(genre='action').count(), 2)
+
+    def test_facets_cached(self):
+        q = self.idx.search().facets('genre')
+        page = q[:2]
+        self.assertEqual(len([d for d in page]), 2)
+
+        # Every page and clone of the query shares the facets fetched with it
+        self.assertIs(q[2:4].get_facets(), page.get_facets())
+
+        # Facet results depend on the refinements
+        refined = q.refine(genre='comedy').get_facets()
+        self.assertEqual(refined['genre'], [FacetValue('comedy', 'comedy', 1)])
+
+        # ...and are fetched again once the index changes
+        self.idx.delete('a')
+        self.assertEqual(
+            sorted(q.get_facets()['genre']),
+            [FacetValue('action', 'action', 1), FacetValue('comedy', 'comedy', 1)]
+        )
+
+    def test_no_facets(self):
+        self.assertRaises(ValueError, self.idx.search().get_facets)
@@ -35,6 +35,10 @@ class Base(object):
         f = self.new_field(self.field_class)
         self.assertEquals(f.to_search_value(None), f.none_value())
 
+    def test_to_search_values_none(self):
+        f = self.new_field(self.field_class)
+        self.assertEquals(f.to_search_values([None] * 100), [f.none_value()] * 100)
+
 
 class TestBaseField(Base, unittest.TestCase):
     field_class = fields.Field
@@ -88,6 +92,17 @@ class TestFloatField(Base, unittest.TestCase):
         f = self.new_field(self.field_class)
         self.assertEquals(f.to_search_value(987), 987.0)
 
+    def test_to_search_values(self):
+        f = self.new_field(self.field_class, default=1.5, null=False)
+        values = [float(i) for i in range(99)] + [None]
+        result = f.to_search_values(values)
+        self.assertEquals(result, values[:-1] + [1.5])
+        self.assertEquals(f.to_pythons(result), result)
+
+    def test_to_pythons_none_value(self):
+        f = self.new_field(self.field_class)
+        self.assertEquals(f.to_pythons([f.none_value()] * 100), [None] * 100)
+
     def test_max_min_limits(self):
         f = self.new_field(self.field_class, minimum=2.0, maximum=4.7)
         self.assertEquals(f.to_search_value(2.0), 2.0)
@@ -120,6 +135,18 @@ class TestIntegerField(Base, unittest.TestCase):
         f = self.new_field(self.field_class)
         self.assertEquals(f.to_search_value('987'), 987)
 
+    def test_to_search_values(self):
+        f = self.new_field(self.field_class)
+        values = range(99) + ['99']
+        result = f.to_search_values(values)
+        self.assertEquals(result, range(100))
+        self.assertEquals(f.to_pythons(result), range(100))
+
+    def test_to_search_values_limits(self):
+        f = self.new_field(self.field_class, minimum=2, maximum=4)
+        self.assertRaises(ValueError, f.to_search_values, [3] * 99 + [5])
+        self.assertRaises(ValueError, f.to_search_values, [1] + [3] * 99)
+
     def test_max_min_limits(self):
         f = self.new_field(self.field_class, minimum=2, maximum=4)
         self.assertEquals(f.to_search_value(2), 2)
@@ -160,6 +187,12 @@ class TestBooleanField(Base, unittest.TestCase):
         f = self.new_field(self.field_class)
         self.assertEquals(f.to_search_value(False), 0)
 
+    def test_from_search_value(self):
+        f = self.new_field(self.field_class)
+        self.assertEquals(f.from_search_value(1.0), True)
+        self.assertEquals(f.from_search_value(0.0), False)
+        self.assertIsNone(f.from_search_value(float(f.none_value())))
+
 
 class TestDateField(Base, unittest.TestCase):
     field_class = fields.DateField
@@ -226,6 +259,14 @@ class TestDateTimeField(Base, unittest.TestCase):
         with self.assertRaisesRegexp(TypeError, r'Datetime values must be offset-naive'):
             field.to_search_value(xmas)
 
+    def test_to_search_values(self):
+        field = self.new_field(fields.DateTimeField)
+        values = [datetime(2016, 12, 25, 0, i, 30) for i in range(60)]
+        result = field.to_search_values(values)
+
+        self.assertEqual(result, [field.to_search_value(v) for v in values])
+        self.assertEqual(field.to_pythons(result), values)
+
     def test_error_using_too_early_datetime(self):
         timestamp = fields.MIN_SEARCH_API_INT - 1
         olden_times = datetime.utcfromtimestamp(timestamp)
@@ -285,6 +326,10 @@ class TestGeoField(Base, unittest.TestCase):
         f = self.new_field(self.field_class, null=False)
         self.assertRaises(TypeError, f.to_search_value, None)
 
+    def test_to_search_values_none(self):
+        f = self.new_field(self.field_class)
+        self.assertRaises(TypeError, f.to_search_values, [None])
+
     def test_to_search_value_null_no_default(self):
         self.assertRaises(
             AssertionError,
@@ -302,6 +347,10 @@ class TestGeoField(Base, unittest.TestCase):
         f = self.new_field(self.field_class)
         self.assertRaises(TypeError, f.to_search_value, None)
 
+    def test_to_search_values_none(self):
+        f = self.new_field(self.field_class)
+        self.assertRaises(TypeError, f.to_search_values, [None])
+
     def test_to_search_value_errors(self):
         f = self.new_field(self.field_class)
 
@@ -0,0 +1,239 @@
+import sys
+import time
+import unittest
+
+from google.appengine.api import search as search_api
+
+from ..cache import ResultCache
+from ..errors import BadValueError
+from ..fields import IntegerField, TextField
+from ..fingerprints import LRUFingerprintStore
+from ..indexes import DocumentModel, Index, wait_all
+from ..ql import Param
+from ..query import SearchQuery
+
+from .base import AppengineTestCase
+
+
+class FakeDocument(DocumentModel):
+    foo = TextField()
+
+
+class TestDocumentModel(unittest.TestCase):
+    def test_fields_are_descriptors(self):
+        class Thing(DocumentModel):
+            prop = TextField()
+            count = IntegerField()
+
+        self.assertIs(Thing.prop, Thing._meta.fields['prop'])
+
+        thing = Thing(prop='hello')
+        self.assertEqual(thing.prop, 'hello')
+        self.assertIsNone(thing.count)
+        self.assertEqual(thing.__dict__['count'], Thing.count.none_value())
+
+        thing.count = '3'
+        self.assertEqual(thing.count, 3)
+
+
+class TestSerializer(unittest.TestCase):
+    def test_to_search_document(self):
+        doc = FakeDocument(doc_id='a', foo='thing', _rank=3)
+        search_doc = doc._to_search_document()
+
+        self.assertEqual(search_doc.doc_id, 'a')
+        self.assertEqual(search_doc.rank, 3)
+        self.assertEqual(
+            [(f.name, f.value) for f in search_doc.fields],
+            [('foo', 'thing')]
+        )
+
+    def test_unset_fields_use_none_value(self):
+        doc = FakeDocument(doc_id='a')
+        del doc.__dict__['foo']
+
+        search_doc = doc._to_search_document()
+        self.assertEqual(search_doc.fields[0].value, FakeDocument.foo.none_value())
+
+
+class FailedFuture(object):
+    def get_result(self):
+        raise ValueError('Failed')
+
+
+class RecordingFuture(object):
+    def __init__(self, future):
+        self.future = future
+        self.waited = False
+
+    def get_result(self):
+        self.waited = True
+        return self.future.get_result()
+
+
+class TestAsyncWrites(AppengineTestCase):
+    def test_put_and_delete_async(self):
+        idx = Index('dummy', FakeDocument)
+
+        futures = [
+            idx.put_async(FakeDocument(doc_id='a', foo='thing')),
+            idx.put_async([FakeDocument(doc_id='b', foo='thing2')]),
+        ]
+        results = wait_all(futures)
+
+        self.assertEqual([r[0].id for r in results], ['a', 'b'])
+        self.assertEqual(idx.get_range(ids_only=True), ['a', 'b'])
+
+        wait_all([idx.delete_async(['a']), idx.delete_async('b')])
+        self.assertEqual(idx.get_range(ids_only=True), [])
+
+    def test_wait_all_keeps_traceback(self):
+        try:
+            wait_all([FailedFuture(), FailedFuture()])
+        except ValueError:
+            tb = sys.exc_info()[2]
+        while tb.tb_next is not None:
+            tb = tb.tb_next
+        self.assertEqual(tb.tb_frame.f_code.co_name, 'get_result')
+
+
+class TestPutStream(AppengineTestCase):
+    def test_put_stream(self):
+        idx = Index('dummy', FakeDocument)
+
+        def generate():
+            for i in xrange(450):
+                yield FakeDocument(doc_id='%03d' % i, foo='thing')
+
+        count = idx.put_stream(generate(), max_in_flight=2)
+
+        self.assertEqual(count, 450)
+        self.assertEqual(len(idx.get_range(ids_only=True, limit=1000)), 450)
+
+    def test_put_stream_drops_duplicates(self):
+        idx = Index('dummy', FakeDocument)
+
+        count = idx.put_stream([
+            FakeDocument(doc_id='a', foo='first'),
+            FakeDocument(doc_id='b', foo='thing'),
+            FakeDocument(doc_id='a', foo='second'),
+        ])
+
+        self.assertEqual(count, 2)
+        self.assertEqual(idx.get('a').foo, 'second')
+
+    def test_put_stream_waits_after_error(self):
+        futures = []
+        invalidated = []
+
+        class FailingIndex(Index):
+            def put_async(self, documents):
+                if not futures:
+                    future = FailedFuture()
+                else:
+                    future = Index.put_async(self, documents)
+                futures.append(RecordingFuture(future))
+                return futures[-1]
+
+            def invalidate_results(self):
+                invalidated.append(1)
+                Index.invalidate_results(self)
+
+        idx = FailingIndex('dummy', FakeDocument)
+        docs = [FakeDocument(doc_id=str(i), foo='thing') for i in xrange(5)]
+
+        self.assertRaises(
+            ValueError, idx.put_stream, docs, batch_size=1, max_in_flight=2
+        )
+        self.assertEqual(len(futures), 2)
+        self.assertTrue(all(future.waited for future in futures))
+        self.assertEqual(len(invalidated), 1)
+
+    def test_put_over_batch_limit(self):
+        idx = Index('dummy', FakeDocument)
+        docs = [FakeDocument(doc_id='%03d' % i, foo='thing') for i in xrange(250)]
+
+        results = idx.put(docs)
+
+        self.assertEqual(len(results), 250)
+        self.assertEqual(len(idx.get_range(ids_only=True, limit=1000)), 250)
+
+
+class TestFingerprints(AppengineTestCase):
+    def test_unchanged_documents_skipped(self):
+        idx = Index('dummy', FakeDocument, fingerprint_store=LRUFingerprintStore())
+
+        self.assertEqual(len(idx.put(FakeDocument(doc_id='a', foo='thing'))), 1)
+        self.assertEqual(idx.put(FakeDocument(doc_id='a', foo='thing')), [])
+
+        results = idx.put([
+            FakeDocument(doc_id='a', foo='thing'),
+            FakeDocument(doc_id='b', foo='thing'),
+        ])
+        self.assertEqual([r.id for r in results], ['b'])
+
+        # A changed rank counts as a change
+        results = idx.put(FakeDocument(doc_id='a', foo='thing', _rank=5))
+        self.assertEqual(len(results), 1)
+
+    def test_default_rank_ignored(self):
+        idx = Index('dummy', FakeDocument, fingerprint_store=LRUFingerprintStore())
+        now = time.time()
+        real_time = time.time
+
+        # The Search API gives documents without a rank one based on the time
+        try:
+            time.time = lambda: now
+            self.assertEqual(len(idx.put(FakeDocument(doc_id='a', foo='thing'))), 1)
+            time.time = lambda: now + 5
+            self.assertEqual(idx.put(FakeDocument(doc_id='a', foo='thing')), [])
+        finally:
+            time.time = real_time
+
+    def test_delete_forgets_fingerprint(self):
+        idx = Index('dummy', FakeDocument, fingerprint_store=LRUFingerprintStore())
+        idx.put(FakeDocument(doc_id='a', foo='thing'))
+        idx.delete('a')
+
+        self.assertEqual(len(idx.put(FakeDocument(doc_id='a', foo='thing'))), 1)
+        self.assertEqual(idx.get_range(ids_only=True), ['a'])
+
+
+class BrokenIndex(object):
+    name = 'broken'
+    namespace = ''
+
+    def search_async(self, search_query):
+        raise search_api.QueryError('Failed to parse query')
+
+
+class TestMultiSearch(AppengineTestCase):
+    def test_multi_search(self):
+        films = Index('films', FakeDocument)
+        films.put(FakeDocument(doc_id='a', foo='thing'))
+        people = Index('people', FakeDocument, result_cache=ResultCache())
+        people.put(FakeDocument(doc_id='b', foo='thing2'))
+
+        people_query = people.search()
+        results = Index.multi_search([
+            films.search(),
+            people_query,
+            SearchQuery(BrokenIndex(), document_class=FakeDocument),
+        ])
+
+        self.assertEqual([d.doc_id for d in results[0]], ['a'])
+        self.assertEqual([d.doc_id for d in results[1]], ['b'])
+        self.assertIsInstance(results[2], search_api.QueryError)
+
+        # Only Search API errors are returned
+        self.assertRaises(
+            BadValueError,
+            Index.multi_search,
+            [films.search().filter(foo=Param('foo'))]
+        )
+
+        # The queries keep their results, and cached ones aren't searched again
+        self.assertEqual(len(people_query), 1)
+        results = Index.multi_search([people.search()])
+        self.assertEqual([d.doc_id for d in results[0]], ['b'])
+        self.assertEqual(people.result_cache.hits, 1)
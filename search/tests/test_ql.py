@@ -1,7 +1,8 @@
 import datetime
 import unittest
 
-from search.ql import Query, Q, GeoQueryArguments
+from search.errors import BadValueError
+from search.ql import Query, Q, GeoQueryArguments, Param
 from search.fields import TextField, GeoField, DateField
 from search.indexes import DocumentModel
 
@@ -50,6 +51,55 @@ class TestQuery(unittest.TestCase):
             u'((foo:"42") OR (foo:"128"))',
             unicode(query))
 
+class TestCompiledQuery(unittest.TestCase):
+    def test_compiled_once(self):
+        q_1 = Q(foo=42)
+        query = Query(FakeDocument)
+        query.add_q(q_1)
+        query.add_q(Q(foo=128), conn=Q.OR)
+
+        self.assertEqual(unicode(query), u'((foo:"42") OR (foo:"128"))')
+        self.assertEqual(q_1._compiled, {(FakeDocument, False): u'(foo:"42")'})
+        self.assertEqual(unicode(query), u'((foo:"42") OR (foo:"128"))')
+
+    def test_immutable(self):
+        q_1 = Q(foo=42)
+        query = Query(FakeDocument)
+        query.add_q(q_1)
+        query.add_q(Q(foo=128))
+        self.assertEqual(unicode(query), u'((foo:"42") AND (foo:"128"))')
+
+        self.assertRaises(AttributeError, setattr, q_1, 'inverted', True)
+        self.assertRaises(AttributeError, setattr, q_1, 'children', ())
+
+        self.assertRaises(AttributeError, q_1.add, ('foo', 64))
+
+        # Changes make new nodes, sharing the old ones
+        q_2 = q_1.combine(('foo', 64))
+        q_3 = ~q_2
+        self.assertIs(q_3.children, q_2.children)
+        self.assertEqual(q_1.children, (('foo', 42),))
+
+        query = Query(FakeDocument)
+        query.add_q(q_3)
+        self.assertEqual(unicode(query), u'NOT (foo:"42" AND foo:"64")')
+
+
+class TestPreparedQuery(unittest.TestCase):
+    def test_render(self):
+        query = Query(FakeDocument)
+        query.add_q(Q(foo__contains=Param('foo')) & Q(bar__gt=Param('bar')))
+        template = query.prepare()
+
+        self.assertEqual(template.get_param_names(), set(['foo', 'bar']))
+        self.assertEqual(
+            template.render({'foo': 'a b', 'bar': datetime.date(2016, 1, 1)}),
+            u'((foo:(a b)) AND (bar > 2016-01-01 AND NOT bar:9999-12-31))'
+        )
+        self.assertRaises(BadValueError, template.render, {'foo': 'a'})
+        self.assertRaises(BadValueError, unicode, query)
+
+
 class TestGeoQuery(unittest.TestCase):
 
     def test_geosearch(self):
@@ -1,12 +1,18 @@
 import datetime
+import pickle
 import unittest
 
 from google.appengine.api import search as search_api
 
 from ..indexes import DocumentModel, Index
-from ..fields import TZDateTimeField, TextField
-from ..query import SearchQuery
-from ..ql import Q
+from ..cache import ResultCache
+from ..errors import BadValueError, FieldLookupError, FieldNotLoadedError
+from ..fields import (
+    DateField, FloatField, IntegerField, TZDateTimeField, TextField
+)
+from ..query import SearchQuery, construct_document
+from ..ql import Param, Q
+from ..singleflight import SearchScope
 from .. import timezone
 
 from .base import AppengineTestCase
@@ -17,6 +23,102 @@ class FakeDocument(DocumentModel):
     created = TZDateTimeField()
 
 
+class TestConstructDocument(unittest.TestCase):
+    def test_compact_result(self):
+        api_doc = search_api.ScoredDocument(
+            doc_id='a',
+            fields=[search_api.TextField(name='foo', value='bar <b>baz</b>')],
+            expressions=[search_api.TextField(name='foo', value='<b>baz</b>')],
+            rank=42
+        )
+        doc = construct_document(FakeDocument, api_doc)
+
+        self.assertIsInstance(doc, FakeDocument)
+        self.assertEqual(type(doc).__name__, 'FakeDocument')
+        self.assertEqual(doc.doc_id, 'a')
+        self.assertEqual(doc._rank, 42)
+        self.assertEqual(doc.foo, 'bar <b>baz</b>')
+        self.assertIsNone(doc.created)
+        self.assertEqual(doc.get_snippets(), {'foo': '<b>baz</b>'})
+        self.assertEqual(
+            doc.snippet_or_value(),
+            {'foo': '<b>baz</b>', 'created': None}
+        )
+        # Everything is kept in slots
+        self.assertEqual(doc.__dict__, {})
+
+    def test_result_is_document_subclass(self):
+        class Mixin(object):
+            def shout(self):
+                return self.foo.upper()
+
+        class LoudDocument(Mixin, FakeDocument):
+            def shout(self):
+                return super(LoudDocument, self).shout() + '!'
+
+        api_doc = search_api.ScoredDocument(
+            doc_id='a', fields=[search_api.TextField(name='foo', value='bar')]
+        )
+        doc = construct_document(LoudDocument, api_doc)
+
+        self.assertTrue(issubclass(type(doc), LoudDocument))
+        self.assertIsInstance(doc, Mixin)
+        self.assertEqual(doc.shout(), 'BAR!')
+
+    def test_pickle_result(self):
+        api_doc = search_api.ScoredDocument(
+            doc_id='a',
+            fields=[search_api.TextField(name='foo', value='bar')],
+            expressions=[search_api.TextField(name='foo', value='<b>bar</b>')]
+        )
+        doc = pickle.loads(pickle.dumps(construct_document(FakeDocument, api_doc)))
+
+        self.assertIsInstance(doc, FakeDocument)
+        self.assertEqual(doc.doc_id, 'a')
+        self.assertEqual(doc.foo, 'bar')
+        self.assertEqual(doc.get_snippets(), {'foo': '<b>bar</b>'})
+
+    def test_lazy_result(self):
+        created = datetime.datetime(2016, 12, 31, 12, tzinfo=timezone.utc)
+        api_doc = search_api.ScoredDocument(
+            doc_id='a',
+            fields=[
+                search_api.TextField(name='foo', value='bar'),
+                search_api.NumberField(
+                    name='created',
+                    value=timezone.datetime_to_timestamp(created.replace(tzinfo=None))
+                ),
+            ]
+        )
+        doc = construct_document(FakeDocument, api_doc, lazy=True)
+
+        self.assertEqual(doc._raw['foo'], 'bar')
+        self.assertRaises(AttributeError, getattr, doc, '_f_foo')
+        self.assertEqual(doc.foo, 'bar')
+        self.assertEqual(doc._f_foo, 'bar')
+        self.assertEqual(doc.created, created)
+
+    def test_trusted_matches_validated(self):
+        created = datetime.datetime(2016, 12, 31, 12)
+        api_doc = search_api.ScoredDocument(
+            doc_id='a',
+            fields=[
+                search_api.TextField(name='foo', value='bar'),
+                search_api.NumberField(
+                    name='created',
+                    value=timezone.datetime_to_timestamp(created)
+                ),
+            ]
+        )
+        trusted = construct_document(FakeDocument, api_doc)
+        validated = construct_document(FakeDocument, api_doc, trusted=False)
+
+        for doc in (trusted, validated):
+            self.assertEqual(doc.foo, 'bar')
+            self.assertEqual(doc.created, created.replace(tzinfo=timezone.utc))
+        self.assertEqual(trusted._f_created, validated._f_created)
+
+
 class TestSearchQueryClone(unittest.TestCase):
     def test_clone_keywords(self):
         q = SearchQuery("dummy", document_class=FakeDocument).keywords("bar")
@@ -52,6 +154,26 @@ class TestSearchQueryClone(unittest.TestCase):
             unicode(q1.query)
         )
 
+    def test_no_aliasing(self):
+        q = SearchQuery("dummy", document_class=FakeDocument).keywords("foo")
+        q_1 = q.order_by('foo').snippet('foo').keywords('bar')
+        q_2 = q.order_by('-created').add_expression('x', 'foo')
+
+        self.assertEqual(q._sorts, ())
+        self.assertEqual(len(q_1._sorts), 1)
+        self.assertEqual(len(q_2._sorts), 1)
+        self.assertEqual(q._snippeted_fields, ())
+        self.assertEqual(q_2._snippeted_fields, ())
+        self.assertEqual(q_1._returned_expressions, ())
+        self.assertEqual(q.query.get_keywords(), ("foo",))
+        self.assertEqual(q_2.query.get_keywords(), ("foo",))
+
+    def test_clone_keeps_limits(self):
+        q = SearchQuery("dummy", document_class=FakeDocument)[5:10]
+        clone = q.order_by('foo')
+
+        self.assertEqual((clone._offset, clone._limit), (5, 5))
+
 
 class TestSearchQueryFilter(unittest.TestCase):
     def test_filter_on_datetime_field(self):
@@ -80,3 +202,353 @@ class TestCursor(AppengineTestCase):
         self.assertEqual(1, len(results)) # but only one document
         self.assertEqual('thing2', results[0].foo)
         self.assertFalse(q2.next_cursor)
+
+
+class TestProjection(AppengineTestCase):
+    def test_only(self):
+        idx = Index('dummy', FakeDocument)
+        idx.put(FakeDocument(doc_id='a', foo='thing'))
+
+        q = idx.search().only('foo')
+        self.assertEqual(q.get_returned_fields(), ['foo'])
+
+        doc = list(q)[0]
+        self.assertEqual(doc.foo, 'thing')
+        self.assertRaises(FieldNotLoadedError, getattr, doc, 'created')
+        self.assertEqual(doc.snippet_or_value(), {'foo': 'thing'})
+
+    def test_defer(self):
+        idx = Index('dummy', FakeDocument)
+        idx.put(FakeDocument(doc_id='a', foo='thing'))
+
+        q = idx.search().defer('foo')
+        self.assertEqual(q.get_returned_fields(), ['created'])
+
+        doc = list(q.lazy())[0]
+        self.assertIsNone(doc.created)
+        self.assertRaises(FieldNotLoadedError, getattr, doc, 'foo')
+
+        self.assertIsNone(q.defer().get_returned_fields())
+
+    def test_unknown_field(self):
+        q = Index('dummy', FakeDocument).search()
+        self.assertRaises(ValueError, q.only, 'bar')
+        self.assertRaises(ValueError, q.defer, 'bar')
+
+
+class TestValues(AppengineTestCase):
+    def setUp(self):
+        super(TestValues, self).setUp()
+        self.idx = Index('dummy', FakeDocument)
+        self.idx.put(FakeDocument(doc_id='a', foo='thing'))
+        self.idx.put(FakeDocument(doc_id='b', foo='thing2'))
+
+    def test_values(self):
+        q = self.idx.search().order_by('foo').values('doc_id', 'foo')
+        self.assertEqual(q.get_returned_fields(), ['foo'])
+        self.assertEqual(
+            list(q),
+            [{'doc_id': 'a', 'foo': 'thing'}, {'doc_id': 'b', 'foo': 'thing2'}]
+        )
+
+    def test_values_doc_id_only(self):
+        q = self.idx.search().order_by('foo').values('doc_id')
+        self.assertTrue(q.get_search_query().options.ids_only)
+        self.assertEqual(list(q), [{'doc_id': 'a'}, {'doc_id': 'b'}])
+
+        q = self.idx.search().only('foo').values_list('doc_id', flat=True)
+        options = q.get_search_query().options
+        self.assertTrue(options.ids_only)
+        self.assertFalse(options.returned_fields)
+        self.assertEqual(list(q), ['a', 'b'])
+
+    def test_values_all_fields(self):
+        q = self.idx.search().order_by('foo').values()
+        self.assertEqual(list(q)[0], {'foo': 'thing', 'created': None})
+
+    def test_values_list(self):
+        q = self.idx.search().order_by('foo')
+        self.assertEqual(
+            list(q.values_list('foo', 'doc_id')),
+            [('thing', 'a'), ('thing2', 'b')]
+        )
+        self.assertEqual(
+            list(q.values_list('foo', flat=True)),
+            ['thing', 'thing2']
+        )
+        self.assertRaises(TypeError, q.values_list, 'foo', 'doc_id', flat=True)
+
+
+class TestCount(AppengineTestCase):
+    def setUp(self):
+        super(TestCount, self).setUp()
+        self.idx = Index('dummy', FakeDocument)
+        self.idx.put(FakeDocument(doc_id='a', foo='thing'))
+        self.idx.put(FakeDocument(doc_id='b', foo='thing2'))
+
+    def test_count_from_fetched_page(self):
+        q = self.idx.search().order_by('foo')
+        page = q[:1]
+        self.assertEqual([d.doc_id for d in page], ['a'])
+
+        # The count comes from the page, not another search
+        self.assertEqual(q.count(), 2)
+        self.assertTrue(q.exists())
+
+        # Until the index changes
+        self.idx.delete(['a', 'b'])
+        self.assertEqual(len(page), 2)
+        self.assertEqual(q.count(), 0)
+        self.assertFalse(q.exists())
+        self.assertEqual(len(q.filter(foo='thing')), 0)
+
+    def test_counts_bounded(self):
+        prepared = self.idx.search().filter(foo=Param('foo')).prepare()
+        prepared._counts.max_size = 5
+        for i in range(10):
+            len(prepared.bind(foo='thing%s' % i))
+        self.assertEqual(len(prepared._counts), 5)
+
+    def test_count_query(self):
+        q = self.idx.search().filter(foo='thing')
+        count_query = q._get_count_query()
+
+        self.assertTrue(count_query.ids_only)
+        self.assertEqual(count_query._limit, 1)
+        self.assertEqual(len(q), 2)
+
+    def test_first(self):
+        q = self.idx.search().order_by('-foo')
+        self.assertEqual(q.first().doc_id, 'b')
+        self.assertEqual(q[1:].first().doc_id, 'a')
+        self.assertIsNone(Index('empty', FakeDocument).search().first())
+
+
+class TestPreparedQuery(unittest.TestCase):
+    def test_bind(self):
+        q = SearchQuery("dummy", document_class=FakeDocument).keywords("film")
+        prepared = q.filter(
+            Q(foo=Param('foo')) | Q(foo__contains=Param('foo'))
+        ).prepare()
+
+        bound = prepared.bind(foo='bar')
+        self.assertEqual(
+            bound.get_query_string(),
+            'film AND ((foo:"bar") OR (foo:(bar)))'
+        )
+        self.assertEqual(bound.get_snippet_words(), u'bar bar film')
+        self.assertEqual(
+            prepared.bind(foo='baz').get_query_string(),
+            'film AND ((foo:"baz") OR (foo:(baz)))'
+        )
+
+    def test_filter_bound_query(self):
+        q = SearchQuery("dummy", document_class=FakeDocument)
+        bound = q.filter(foo=Param('foo')).prepare().bind(foo='bar')
+
+        self.assertEqual(
+            bound.filter(foo='baz').get_query_string(),
+            '((foo:"bar") AND (foo:"baz"))'
+        )
+
+    def test_errors(self):
+        q = SearchQuery("dummy", document_class=FakeDocument)
+        q = q.filter(created__gt=Param('created'))
+
+        self.assertRaises(BadValueError, q.get_query_string)
+        self.assertRaises(ValueError, q.bind, created=1)
+        self.assertRaises(BadValueError, q.prepare().bind)
+        self.assertRaises(
+            FieldLookupError,
+            q.filter(bar=Param('bar')).prepare
+        )
+
+
+class TestAsync(AppengineTestCase):
+    def setUp(self):
+        super(TestAsync, self).setUp()
+        self.idx = Index('dummy', FakeDocument)
+        for doc_id in 'abc':
+            self.idx.put(FakeDocument(doc_id=doc_id, foo=doc_id))
+
+    def test_fetch_async(self):
+        q = self.idx.search().order_by('foo')[:2]
+        future = q.fetch_async()
+
+        self.assertEqual([d.doc_id for d in future.get_result()], ['a', 'b'])
+        self.assertEqual([d.doc_id for d in q], ['a', 'b'])
+        self.assertEqual(len(q), 3)
+
+    def test_prefetch_offset_pages(self):
+        q = self.idx.search().order_by('foo').prefetch()
+
+        with SearchScope() as scope:
+            self.assertEqual([d.doc_id for d in q[0:2]], ['a', 'b'])
+            self.assertEqual(len(scope.prefetched), 1)
+
+            # The second page takes the prefetched search, and is the last
+            # page
+            self.assertEqual([d.doc_id for d in q[2:4]], ['c'])
+            self.assertEqual(len(scope.prefetched), 0)
+
+    def test_prefetch_cursor_pages(self):
+        q = self.idx.search().order_by('foo').prefetch()[:2].set_cursor()
+
+        with SearchScope() as scope:
+            self.assertEqual([d.doc_id for d in q], ['a', 'b'])
+            self.assertEqual(len(scope.prefetched), 1)
+
+            q = q.set_cursor(q.next_cursor)
+            self.assertEqual([d.doc_id for d in q], ['c'])
+            self.assertEqual(len(scope.prefetched), 0)
+
+    def test_prefetch_invalidated(self):
+        q = self.idx.search().order_by('foo').prefetch()
+
+        with SearchScope() as scope:
+            list(q[0:2])
+            self.idx.put(FakeDocument(doc_id='d', foo='d'))
+
+            self.assertEqual(len(scope.prefetched), 0)
+            self.assertEqual([d.doc_id for d in q[2:4]], ['c', 'd'])
+
+    def count_searches(self):
+        calls = []
+        search_async = self.idx._index.search_async
+
+        def counting_search_async(*args, **kwargs):
+            calls.append(1)
+            return search_async(*args, **kwargs)
+
+        self.idx._index.search_async = counting_search_async
+        return calls
+
+    def test_prefetch_not_shared_between_scopes(self):
+        q = self.idx.search().order_by('foo').prefetch()
+        calls = self.count_searches()
+
+        with SearchScope() as scope:
+            self.assertEqual([d.doc_id for d in q[0:2]], ['a', 'b'])
+            self.assertEqual(len(scope.prefetched), 1)
+        self.assertEqual(len(scope.prefetched), 0)
+        self.assertEqual(len(calls), 2)
+
+        # A later request runs its own search for the page instead of
+        # waiting on the first request's RPC
+        with SearchScope():
+            self.assertEqual([d.doc_id for d in q[2:4]], ['c'])
+        self.assertEqual(len(calls), 3)
+
+    def test_no_prefetch_outside_scope(self):
+        q = self.idx.search().order_by('foo').prefetch()
+        calls = self.count_searches()
+
+        self.assertEqual([d.doc_id for d in q[0:2]], ['a', 'b'])
+        self.assertEqual(len(calls), 1)
+
+    def test_no_prefetch_by_default(self):
+        with SearchScope() as scope:
+            list(self.idx.search().order_by('foo')[0:2])
+            self.assertEqual(len(scope.prefetched), 0)
+
+
+class TestIterAll(AppengineTestCase):
+    def setUp(self):
+        super(TestIterAll, self).setUp()
+        self.idx = Index('dummy', FakeDocument)
+        self.idx.put([
+            FakeDocument(doc_id=str(i), foo='thing%02d' % i) for i in range(25)
+        ])
+
+    def test_iter_all(self):
+        q = self.idx.search().order_by('foo')
+        docs = list(q.iter_all(chunk_size=10))
+
+        self.assertEqual([d.foo for d in docs], ['thing%02d' % i for i in range(25)])
+        # Nothing is kept on the query itself
+        self.assertIsNone(q._results_cache)
+
+    def test_iter_all_not_kept(self):
+        # Chunks aren't kept by the open scope or the result cache either
+        result_cache = ResultCache()
+        with SearchScope() as scope:
+            q = self.idx.search().cache(result_cache).order_by('foo')
+            self.assertEqual(len(list(q.iter_all(chunk_size=10))), 25)
+            self.assertEqual(len(scope), 0)
+        self.assertEqual(len(result_cache._responses), 0)
+
+    def test_iter_all_ids_and_values(self):
+        q = self.idx.search(ids_only=True).order_by('foo')
+        self.assertEqual(len(list(q.iter_all(chunk_size=7))), 25)
+
+        q = self.idx.search().order_by('-foo').values_list('foo', flat=True)
+        self.assertEqual(list(q.iter_all(chunk_size=25))[:2], ['thing24', 'thing23'])
+
+    def test_bad_chunk_size(self):
+        q = self.idx.search()
+        self.assertRaises(ValueError, list, q.iter_all(chunk_size=0))
+        self.assertRaises(ValueError, list, q.iter_all(chunk_size=1001))
+
+
+class FakeRatedDocument(DocumentModel):
+    title = TextField()
+    rating = FloatField()
+    pk = IntegerField()
+    released = DateField()
+
+
+class TestAfter(unittest.TestCase):
+    def setUp(self):
+        self.q = SearchQuery('dummy', document_class=FakeRatedDocument)
+
+    def test_single_key(self):
+        q = self.q.order_by('-rating').after(FakeRatedDocument(rating=4.5))
+        self.assertEqual(unicode(q.query), u'(rating < 4.5)')
+
+    def test_tie_breaker(self):
+        q = self.q.order_by('-rating').after({'rating': 4.5, 'pk': 7}, 'pk')
+
+        self.assertEqual(
+            [sort.expression for sort in q._sorts], ['rating', 'pk']
+        )
+        self.assertEqual(
+            unicode(q.query),
+            u'((rating < 4.5) OR '
+            '(((rating >= 4.5) AND (rating <= 4.5)) AND (pk > 7)))'
+        )
+        # The first page is just ordered by the tie breaker too
+        self.assertEqual(len(self.q.order_by('-rating').after(None, 'pk')._sorts), 2)
+
+    def test_dates_and_missing_values(self):
+        # Missing dates sort last
+        q = self.q.order_by('released').after([None])
+        self.assertEqual(unicode(q.query), u'(released > 9999-12-31)')
+
+        # ...so they're included until the last page
+        q = self.q.order_by('released').after([datetime.date(2016, 1, 31)])
+        self.assertEqual(
+            unicode(q.query),
+            u'((released > 2016-01-31 AND NOT released:9999-12-31) OR '
+            '(released:"9999-12-31"))'
+        )
+
+        q = self.q.order_by('-released').after([datetime.date(2016, 1, 31)])
+        self.assertEqual(unicode(q.query), u'(released < 2016-01-31)')
+
+    def test_exact_floats(self):
+        q = self.q.order_by('-rating').after([4.123456789012, 7], 'pk')
+        self.assertEqual(
+            unicode(q.query),
+            u'((rating < 4.123456789012) OR (((rating >= 4.123456789012) AND '
+            '(rating <= 4.123456789012)) AND (pk > 7)))'
+        )
+
+    def test_errors(self):
+        self.assertRaises(ValueError, self.q.after, None)
+        self.assertRaises(ValueError, self.q.after, None, 'nope')
+        self.assertRaises(
+            BadValueError, self.q.order_by('title').after, ['a']
+        )
+        self.assertRaises(
+            ValueError, self.q.order_by('rating', 'pk').after, [1.5]
+        )
@@ -0,0 +1,91 @@
+import threading
+import unittest
+
+from ..fields import TextField
+from ..indexes import DocumentModel, Index
+from ..singleflight import SearchScope, SingleFlight, get_search_scope
+
+from .base import AppengineTestCase
+
+
+class FakeDocument(DocumentModel):
+    foo = TextField()
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_waits_for_call_in_flight(self):
+        single_flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return 'result'
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(single_flight.do('key', fn))
+        )
+        leader.start()
+        started.wait()
+
+        # Let the leader finish once this thread's waiting on it
+        threading.Timer(0.1, release.set).start()
+        results.append(single_flight.do('key', fn))
+        leader.join()
+
+        self.assertEqual(results, ['result', 'result'])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(single_flight), 0)
+
+    def test_errors(self):
+        single_flight = SingleFlight()
+
+        def fn():
+            raise ValueError
+
+        self.assertRaises(ValueError, single_flight.do, 'key', fn)
+        self.assertEqual(single_flight.do('key', lambda: 'result'), 'result')
+
+
+class TestSearchScope(AppengineTestCase):
+    def setUp(self):
+        super(TestSearchScope, self).setUp()
+        self.idx = Index('dummy', FakeDocument)
+        self.idx.put(FakeDocument(doc_id='a', foo='thing'))
+
+    def test_scope(self):
+        with SearchScope() as scope:
+            self.assertIs(get_search_scope(), scope)
+
+            q_1 = self.idx.search().order_by('foo')[:10]
+            q_2 = self.idx.search().order_by('foo')[:10]
+            self.assertEqual([d.doc_id for d in q_1], ['a'])
+            self.assertEqual([d.doc_id for d in q_2], ['a'])
+            self.assertIs(q_1._results_response, q_2._results_response)
+            self.assertEqual(len(scope), 1)
+
+            # Async searches use it too
+            q_3 = self.idx.search().order_by('foo')[:10]
+            q_3.fetch_async()
+            self.assertIs(q_3._results_response, q_1._results_response)
+
+            # Writes forget the index's responses
+            self.idx.put(FakeDocument(doc_id='b', foo='thing'))
+            self.assertEqual(len(scope), 0)
+            self.assertEqual(len(self.idx.search()[:10]), 2)
+
+        self.assertIsNone(get_search_scope())
+        self.assertEqual(len(scope), 0)
+
+    def test_namespaces(self):
+        other_idx = Index('dummy', FakeDocument, namespace='other')
+        other_idx.put(FakeDocument(doc_id='b', foo='thing'))
+
+        with SearchScope() as scope:
+            self.assertEqual([d.doc_id for d in self.idx.search()[:10]], ['a'])
+            self.assertEqual([d.doc_id for d in other_idx.search()[:10]], ['b'])
+            self.assertEqual(len(scope), 2)
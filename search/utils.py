@@ -1,4 +1,6 @@
+import itertools
 import operator
+import sys
 
 
 def get_value_map(obj, mapping):
@@ -12,3 +14,46 @@ def get_value_map(obj, mapping):
         if field_value:
             value_map.append((field_value, fn,))
     return value_map
+
+
+def get_index_key(index):
+    """Get the key that searches on the Search API `index` are cached under:
+    a tuple of its namespace and name, since indexes in different namespaces
+    can have the same name.
+    """
+    return (index.namespace or '', index.name)
+
+
+def wait_all(futures):
+    """Block until all the given futures (as returned by `Index.put_async` and
+    `Index.delete_async`) have finished.
+
+    Returns a list of each future's result, in the same order as `futures`.
+    Raises the first error from any of the futures, with its original
+    traceback, but only once all of them have been waited on.
+    """
+    results = []
+    exc_info = None
+
+    for future in futures:
+        try:
+            results.append(future.get_result())
+        except Exception:
+            results.append(None)
+            exc_info = exc_info or sys.exc_info()
+
+    if exc_info is not None:
+        raise exc_info[0], exc_info[1], exc_info[2]
+    return results
+
+
+def iter_batches(iterable, batch_size):
+    """Split `iterable` into lists of at most `batch_size` items, without
+    consuming more of it than is needed for the next list.
+    """
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch